@@ -1,10 +1,18 @@
 from django.contrib import admin
-from .models import BlogPost
+from .models import ArchivedPost, BlogPost
 
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'status', 'views_count', 'created_at']
     list_filter = ['status', 'created_at']
-    search_fields = ['title', 'content']
+    search_fields = ['title', 'content_text']
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ['views_count', 'created_at', 'updated_at']
+    readonly_fields = ['views_count', 'content_hash', 'created_at', 'updated_at']
+
+@admin.register(ArchivedPost)
+class ArchivedPostAdmin(admin.ModelAdmin):
+    list_display = ['title', 'author', 'status', 'archived_at']
+    list_filter = ['status', 'archived_at']
+    search_fields = ['title', 'slug']
+    exclude = ['payload']
+    readonly_fields = ['post_id', 'slug', 'title', 'author', 'status', 'archived_at']
@@ -0,0 +1,261 @@
+"""
+View analytics: per-process event buffer flushed in bulk into rollup tables.
+
+`record` appends a compact ``(post_id, author_id, tags, hour)`` tuple to a
+bounded deque and returns; nothing touches the database on the request
+path. A daemon thread per process flushes the buffer every
+ANALYTICS_FLUSH_INTERVAL seconds (sooner once ANALYTICS_FLUSH_SIZE events are
+waiting). A flush counts identical events, expands them into hourly and
+daily buckets for the post, its author and each tag, and writes them as
+multi-row ``INSERT ... ON CONFLICT DO UPDATE SET views = views + excluded.views``
+statements. BlogPost.views_count is advanced in the same transaction with one
+UPDATE per distinct increment.
+
+If the buffer is full the oldest events are dropped (counted as
+``analytics.dropped``), so a stalled database costs data, never memory. A
+flush that fails keeps its aggregated counts and retries them with the next
+flush, up to ANALYTICS_FLUSH_ATTEMPTS times. After a successful write the
+new views_count values are published to the cache for the post detail
+payloads (see object_cache.with_view_count).
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.models import F, Sum
+
+from blog_backend.db_router import primary_reads
+
+from . import metrics
+from .models import AuthorViewRollup, BlogPost, PostViewRollup, TagViewRollup
+from .object_cache import set_view_counts
+
+logger = logging.getLogger(__name__)
+
+HOUR = 3600
+DAY = 86400
+PERIOD_SECONDS = {'hour': HOUR, 'day': DAY}
+
+_buffer = deque(maxlen=settings.ANALYTICS_BUFFER_SIZE)
+_wake = threading.Event()
+_flush_lock = threading.Lock()
+_flusher_lock = threading.Lock()
+_flusher_pid = None
+# (aggregates, events, failed flushes) of counts waiting to be written again
+_unwritten = None
+
+
+def record(post_id, author_id, tags, now=None):
+    """Count one view; ``tags`` is the post's tag_list."""
+    if len(_buffer) == _buffer.maxlen:
+        metrics.incr('analytics.dropped')
+    hour = int(now if now is not None else time.time()) // HOUR
+    _buffer.append((post_id, author_id, tuple(tags), hour))
+    if len(_buffer) >= settings.ANALYTICS_FLUSH_SIZE:
+        _wake.set()
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+
+
+def drain():
+    pop = _buffer.popleft
+    events = []
+    for _ in range(len(_buffer)):
+        events.append(pop())
+    return events
+
+
+def aggregate(events):
+    """Rollup increments keyed like their unique constraints, plus views_count totals."""
+    posts, authors, tags, totals = Counter(), Counter(), Counter(), Counter()
+    post_authors = {}
+    for (post_id, author_id, tag_list, hour), count in Counter(events).items():
+        buckets = (('hour', hour * HOUR), ('day', hour * HOUR // DAY * DAY))
+        for period, bucket in buckets:
+            posts[(post_id, period, bucket)] += count
+            authors[(author_id, period, bucket)] += count
+            for tag in tag_list:
+                tags[(tag.lower()[:200], period, bucket)] += count
+        totals[post_id] += count
+        post_authors[post_id] = author_id
+    # One row per conflict key, even if the post changed hands mid-flush
+    posts = {
+        (post_id, post_authors[post_id], period, bucket): count
+        for (post_id, period, bucket), count in posts.items()
+    }
+    return posts, authors, tags, totals
+
+
+def merge(older, newer):
+    """Add two ``aggregate`` results; a post's rows take the newer author."""
+    post_authors = {key[0]: key[1] for key in newer[0]}
+    posts = Counter()
+    for (post_id, author_id, period, bucket), count in (*older[0].items(), *newer[0].items()):
+        posts[(post_id, post_authors.get(post_id, author_id), period, bucket)] += count
+    return (posts, *(Counter(old) + Counter(new) for old, new in zip(older[1:], newer[1:])))
+
+
+def upsert_increments(model, columns, conflict_columns, rows, batch_size):
+    """
+    Add each row's trailing ``views`` to the matching rollup row, inserting
+    missing ones. ``rows`` maps tuples of ``columns`` (bucket last) to counts.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    column_sql = ', '.join(qn(column) for column in (*columns, 'views'))
+    placeholder = '(' + ', '.join(['%s'] * (len(columns) + 1)) + ')'
+    conflict_sql = ', '.join(qn(column) for column in conflict_columns)
+    # Sorted so concurrent flushes lock rows in the same order
+    items = sorted(rows.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            params = []
+            for key, count in batch:
+                params.extend(key[:-1])
+                params.append(connection.ops.adapt_datetimefield_value(
+                    datetime.fromtimestamp(key[-1], tz=timezone.utc)
+                ))
+                params.append(count)
+            cursor.execute(
+                f'INSERT INTO {table} ({column_sql}) VALUES {", ".join([placeholder] * len(batch))} '
+                f'ON CONFLICT ({conflict_sql}) DO UPDATE SET {qn("views")} = '
+                f'{table}.{qn("views")} + excluded.{qn("views")}',
+                params,
+            )
+
+
+def write(posts, authors, tags, totals, batch_size=None):
+    batch_size = batch_size or settings.ANALYTICS_FLUSH_BATCH
+    by_increment = defaultdict(list)
+    for post_id, count in totals.items():
+        by_increment[count].append(post_id)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        upsert_increments(
+            PostViewRollup, ['post_id', 'author_id', 'period', 'bucket'],
+            ['post_id', 'period', 'bucket'], posts, batch_size,
+        )
+        upsert_increments(
+            AuthorViewRollup, ['author_id', 'period', 'bucket'],
+            ['author_id', 'period', 'bucket'], authors, batch_size,
+        )
+        upsert_increments(TagViewRollup, ['tag', 'period', 'bucket'], ['tag', 'period', 'bucket'], tags, batch_size)
+        for count, post_ids in sorted(by_increment.items()):
+            post_ids.sort()
+            for start in range(0, len(post_ids), batch_size):
+                BlogPost.objects.filter(pk__in=post_ids[start:start + batch_size]).update(
+                    views_count=F('views_count') + count
+                )
+
+
+def publish_view_counts(post_ids, batch_size=None):
+    batch_size = batch_size or settings.ANALYTICS_FLUSH_BATCH
+    counts = {}
+    with primary_reads():
+        for start in range(0, len(post_ids), batch_size):
+            counts.update(
+                BlogPost.objects.filter(pk__in=post_ids[start:start + batch_size]).values_list('id', 'views_count')
+            )
+    set_view_counts(counts)
+
+
+def flush():
+    """Write everything buffered so far, plus counts a failed flush left; returns the number of events."""
+    global _unwritten
+    with _flush_lock:
+        events = drain()
+        if not events and _unwritten is None:
+            return 0
+        aggregates, count, failures = aggregate(events), len(events), 0
+        if _unwritten is not None:
+            older, older_count, failures = _unwritten
+            aggregates, count = merge(older, aggregates), count + older_count
+            _unwritten = None
+        try:
+            write(*aggregates)
+        except Exception:
+            metrics.incr('analytics.flush_failed')
+            failures += 1
+            if failures < settings.ANALYTICS_FLUSH_ATTEMPTS:
+                _unwritten = (aggregates, count, failures)
+                logger.exception('Flush of %d view events failed, retrying with the next one', count)
+            else:
+                metrics.incr('analytics.lost', count)
+                logger.exception('Dropped %d view events after %d failed flushes', count, failures)
+            return 0
+        metrics.incr('analytics.flushed', count)
+        try:
+            publish_view_counts(list(aggregates[3]))
+        except Exception:
+            # The counts are stored; detail payloads just show them later
+            logger.exception('Could not publish view counts to the cache')
+        return count
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(settings.ANALYTICS_FLUSH_INTERVAL)
+        _wake.clear()
+        close_old_connections()
+        flush()
+
+
+def _start_flusher():
+    global _flusher_pid
+    # ANALYTICS_FLUSH_INTERVAL = 0 leaves flushing to the caller (tests, benchmarks)
+    if not settings.ANALYTICS_FLUSH_INTERVAL:
+        return
+    with _flusher_lock:
+        # Also runs again in a forked worker, which inherits no threads
+        if _flusher_pid == os.getpid():
+            return
+        threading.Thread(target=_flush_loop, name='analytics-flusher', daemon=True).start()
+        _flusher_pid = os.getpid()
+
+
+atexit.register(flush)
+
+
+def stats():
+    return {
+        'buffered': len(_buffer),
+        'unwritten': _unwritten[1] if _unwritten is not None else 0,
+        'buffer_size': _buffer.maxlen,
+        'flushed': metrics.get('analytics.flushed'),
+        'dropped': metrics.get('analytics.dropped'),
+        'lost': metrics.get('analytics.lost'),
+    }
+
+
+def author_report(author_id, period, buckets, top=10):
+    """The last ``buckets`` hours or days of one author's views, from the rollups alone."""
+    step = PERIOD_SECONDS[period]
+    now = int(time.time())
+    start = datetime.fromtimestamp(now - now % step - (buckets - 1) * step, tz=timezone.utc)
+    counts = dict(
+        AuthorViewRollup.objects.filter(author_id=author_id, period=period, bucket__gte=start)
+        .values_list('bucket', 'views')
+    )
+    series = []
+    for index in range(buckets):
+        bucket = datetime.fromtimestamp(start.timestamp() + index * step, tz=timezone.utc)
+        series.append({'bucket': bucket, 'views': counts.get(bucket, 0)})
+    top_posts = (
+        PostViewRollup.objects.filter(author_id=author_id, period=period, bucket__gte=start)
+        .values('post_id').annotate(views=Sum('views')).order_by('-views', 'post_id')[:top]
+    )
+    return {
+        'author_id': author_id,
+        'period': period,
+        'start': start,
+        'total_views': sum(counts.values()),
+        'series': series,
+        'top_posts': list(top_posts),
+    }
@@ -1,9 +1,11 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from .throttling import PublicReadThrottle
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@throttle_classes([PublicReadThrottle])
 def api_documentation(request):
     """
     Complete API documentation for the Django Blog Backend
@@ -22,20 +24,37 @@ def api_documentation(request):
                 "GET /users/{id}/": "Get user by ID",
                 "GET /users/profile/": "Get current user profile",
                 "GET /users/authors/": "List all authors",
+                "GET /users/authors/directory/": "Authors with post counts, total views and latest publish date (keyset paginated, ?ordering=-post_count|-total_views|-latest_published_at|username)",
             },
             "Blog Posts": {
                 "POST /blog/posts/": "Create new post (authors only)",
                 "GET /blog/posts/{slug}/": "Get post by slug",
+                "GET /blog/posts/{slug}/related/": "Related posts, best match first",
                 "PUT /blog/posts/{slug}/": "Update post (author/admin only)",
                 "DELETE /blog/posts/{slug}/": "Delete post (author/admin only)",
                 "GET /blog/my-posts/": "Get current user's posts",
             },
+            "Feeds": {
+                "GET /blog/feeds/sitemap.xml": "Sitemap index (also at /sitemap.xml)",
+                "GET /blog/feeds/rss.xml": "Latest posts (RSS; atom.xml for Atom)",
+                "GET /blog/feeds/authors/{id}/rss.xml": "Latest posts by an author (RSS; atom.xml for Atom)",
+                "GET /blog/feeds/tags/{key}/rss.xml": "Latest posts with a tag (RSS; atom.xml for Atom); key is the tag slug, plus a hash suffix for tags the slug does not spell exactly",
+            },
+            "Analytics": {
+                "GET /blog/analytics/authors/{id}/": "Views per day (or ?period=hour) of an author's posts with top posts; ?buckets=N (author themselves or admin)",
+            },
+            "Operations": {
+                "GET /blog/metrics/": "Throttle and request-coalescing counters (admins only)",
+            },
         },
         "authentication": {
             "type": "JWT Bearer Token",
             "header": "Authorization: Bearer <token>",
             "note": "Get token from /auth/jwt/create/ endpoint"
         },
+        "rate_limits": {
+            "Public reads": "Token bucket per IP (anonymous) or per user; 429 with Retry-After when exhausted",
+        },
         "permissions": {
             "Public": "No authentication required",
             "Authenticated": "Valid JWT token required",
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_save
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+    
+    def ready(self):
+        from .object_cache import author_saved
+        # Cached post payloads embed the author's profile
+        post_save.connect(author_saved, sender=settings.AUTH_USER_MODEL, dispatch_uid='blog.author_saved')
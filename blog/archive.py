@@ -0,0 +1,160 @@
+"""
+Hot/cold archival tier for posts.
+
+Archived and long-inactive posts are moved out of `BlogPost` into
+`ArchivedPost`, one zlib-compressed JSON payload per post, so lists, search
+and counts no longer scan their rows and index entries. The rendered HTML and
+plain-text columns are not stored: they are derived from the content and
+re-rendered on read or restore. Lookups by slug fall back to the cold table
+transparently (see `BlogPostDetailView.get_object`).
+"""
+import json
+import zlib
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedPost, BlogPost, sync_post_tags
+from .object_cache import post_detail_cache
+
+DERIVED_FIELDS = {'content_html', 'content_text', 'content_hash'}
+DATETIME_FIELDS = {'created_at', 'updated_at', 'published_at'}
+COMPRESSION_LEVEL = 6
+
+
+def archived_fields():
+    return [
+        field.attname for field in BlogPost._meta.concrete_fields
+        if field.attname not in DERIVED_FIELDS
+    ]
+
+
+def _encode(value):
+    # Full isoformat; DjangoJSONEncoder would truncate to milliseconds
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+
+def compress_post(values):
+    return zlib.compress(json.dumps(values, default=_encode).encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def decompress_post(payload):
+    """Rebuild an unsaved BlogPost, with its rendered fields, from an archive payload."""
+    values = json.loads(zlib.decompress(bytes(payload)))
+    for name in DATETIME_FIELDS:
+        if values.get(name):
+            values[name] = parse_datetime(values[name])
+    post = BlogPost(**values)
+    post.render_content()
+    return post
+
+
+def archive_candidates(inactive_days=None, max_views=None):
+    """Posts marked archived, plus posts untouched for ``inactive_days`` if given."""
+    condition = Q(status='archived')
+    if inactive_days is not None:
+        stale = Q(updated_at__lt=timezone.now() - timedelta(days=inactive_days))
+        if max_views is not None:
+            stale &= Q(views_count__lte=max_views)
+        condition |= stale
+    return BlogPost.objects.filter(condition)
+
+
+def archive_posts(queryset, batch_size=500):
+    """
+    Move the posts in ``queryset`` to cold storage, one transaction per batch.
+
+    Posts whose slug is already held by an archived post (e.g. one that could
+    not be restored) stay live. Returns ``(archived, skipped)``.
+    """
+    fields = archived_fields()
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    archived = skipped = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            rows = list(BlogPost.objects.filter(pk__in=ids[start:start + batch_size]).values(*fields))
+            taken = set(
+                ArchivedPost.objects.filter(slug__in=[row['slug'] for row in rows]).values_list('slug', flat=True)
+            )
+            cold = [
+                ArchivedPost(
+                    post_id=row['id'],
+                    slug=row['slug'],
+                    title=row['title'],
+                    author_id=row['author_id'],
+                    status=row['status'],
+                    payload=compress_post(row),
+                )
+                for row in rows
+                if row['slug'] not in taken
+            ]
+            ArchivedPost.objects.bulk_create(cold)
+            BlogPost.objects.filter(pk__in=[post.post_id for post in cold]).delete()
+        post_detail_cache.delete_many([post.slug for post in cold])
+        archived += len(cold)
+        skipped += len(rows) - len(cold)
+    return archived, skipped
+
+
+def restore_posts(queryset, batch_size=500):
+    """
+    Move archived posts back into BlogPost, keeping their original ids.
+
+    Posts whose slug has since been taken by a live post are left in the
+    archive. Returns ``(restored, skipped)``.
+    """
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    restored = skipped = 0
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            batch = list(ArchivedPost.objects.filter(pk__in=ids[start:start + batch_size]))
+            taken = set(
+                BlogPost.objects.filter(slug__in=[entry.slug for entry in batch]).values_list('slug', flat=True)
+            )
+            restorable = [entry for entry in batch if entry.slug not in taken]
+            posts = [decompress_post(entry.payload) for entry in restorable]
+            timestamps = [(post.created_at, post.updated_at) for post in posts]
+            BlogPost.objects.bulk_create(posts)
+            # bulk_create stamps auto_now/auto_now_add fields with the current time
+            for post, (created_at, updated_at) in zip(posts, timestamps):
+                post.created_at, post.updated_at = created_at, updated_at
+            BlogPost.objects.bulk_update(posts, ['created_at', 'updated_at'])
+            sync_post_tags(posts)
+            ArchivedPost.objects.filter(pk__in=[entry.pk for entry in restorable]).delete()
+        restored += len(restorable)
+        skipped += len(batch) - len(restorable)
+    return restored, skipped
+
+
+def find_archived(slug):
+    """Cold-path lookup used when a slug is not in the hot table."""
+    entry = ArchivedPost.objects.filter(slug=slug).only('payload').first()
+    if entry is None:
+        return None
+    return decompress_post(entry.payload)
+
+
+def table_sizes():
+    """
+    Heap and index sizes in bytes of the hot and cold tables.
+
+    Only PostgreSQL reports relation sizes; other backends return None.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    sizes = {}
+    with connection.cursor() as cursor:
+        for model in (BlogPost, ArchivedPost):
+            table = model._meta.db_table
+            cursor.execute(
+                "SELECT pg_table_size(%s), pg_indexes_size(%s), pg_total_relation_size(%s)",
+                [table, table, table],
+            )
+            table_bytes, index_bytes, total_bytes = cursor.fetchone()
+            sizes[table] = {'table': table_bytes, 'indexes': index_bytes, 'total': total_bytes}
+    return sizes
@@ -0,0 +1,169 @@
+import hashlib
+import re
+from collections import namedtuple
+from html import escape
+from html.parser import HTMLParser
+
+EXCERPT_LENGTH = 300
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'em', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's',
+    'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr', 'ul',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+BLOCK_TAGS = {
+    'blockquote', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li',
+    'p', 'pre', 'table', 'tr',
+}
+# Elements whose text must never reach the output, not even as plain text.
+# Only elements with content belong here: a void one like <embed> never
+# closes, so counting it would drop the rest of the post.
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'template'}
+ALLOWED_ATTRIBUTES = {
+    'a': {'href', 'title'},
+    'abbr': {'title'},
+    'img': {'src', 'alt', 'title'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_URL_SCHEMES = {'http', 'https', 'mailto'}
+
+MARKUP_RE = re.compile(r'<\s*/?\s*[a-zA-Z!]')
+WHITESPACE_RE = re.compile(r'\s+')
+PARAGRAPH_SPLIT_RE = re.compile(r'\n\s*\n')
+
+RenderedContent = namedtuple('RenderedContent', ['html', 'text', 'excerpt', 'hash'])
+
+
+def content_hash(content):
+    """Stable fingerprint of the raw content, used to skip re-rendering."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _is_safe_url(value):
+    value = value.strip()
+    if ':' not in value.split('/', 1)[0]:
+        # Relative URLs and fragments
+        return True
+    scheme = value.split(':', 1)[0].lower()
+    return scheme in ALLOWED_URL_SCHEMES
+
+
+class ContentSanitizer(HTMLParser):
+    """Single pass over the markup producing allowlisted HTML and plain text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html_parts = []
+        self.text_parts = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+        if tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        rendered_attrs = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _is_safe_url(value):
+                continue
+            rendered_attrs.append(f' {name}="{escape(value, quote=True)}"')
+        if tag == 'a':
+            rendered_attrs.append(' rel="nofollow noopener"')
+        self.html_parts.append(f'<{tag}{"".join(rendered_attrs)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            # Self-closed, so there is no content to drop
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text_parts.append('\n')
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside this element so the output stays balanced
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.html_parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html_parts.append(escape(data, quote=False))
+        self.text_parts.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html_parts.append(f'</{self.open_tags.pop()}>')
+
+
+def _normalize_text(text):
+    lines = (WHITESPACE_RE.sub(' ', line).strip() for line in text.split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _render_plain(content):
+    """Plain text posts: blank lines separate paragraphs, newlines become <br>."""
+    paragraphs = [p.strip() for p in PARAGRAPH_SPLIT_RE.split(content) if p.strip()]
+    html = ''.join(
+        '<p>' + '<br>'.join(escape(line, quote=False) for line in p.splitlines()) + '</p>'
+        for p in paragraphs
+    )
+    return html, _normalize_text(content)
+
+
+def _render_markup(content):
+    sanitizer = ContentSanitizer()
+    sanitizer.feed(content)
+    sanitizer.close()
+    return ''.join(sanitizer.html_parts), _normalize_text(''.join(sanitizer.text_parts))
+
+
+def make_excerpt(text, limit=EXCERPT_LENGTH):
+    """Cut plain text at the last word boundary that fits within ``limit``."""
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 3]
+    if text[limit - 3] != ' ' and ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip(' .,;:-') + '...'
+
+
+def render_content(content):
+    """Render raw post content into sanitized HTML, plain text and an excerpt."""
+    if MARKUP_RE.search(content):
+        html, text = _render_markup(content)
+    else:
+        html, text = _render_plain(content)
+    return RenderedContent(
+        html=html,
+        text=text,
+        excerpt=make_excerpt(text),
+        hash=content_hash(content),
+    )
@@ -0,0 +1,364 @@
+"""
+Static sitemap and RSS/Atom feed files.
+
+Feeds are written under FEEDS_ROOT next to a gzip-precompressed copy and
+served by `views.feed_file` with ETags, so crawlers and feed readers never
+hit the JSON API. Layout:
+
+    sitemap.xml                     index of the shards below
+    sitemaps/posts-<n>.xml          published posts with id in shard n
+    rss.xml, atom.xml               latest posts
+    authors/<id>/rss.xml, atom.xml  latest posts of one author
+    tags/<key>/rss.xml, atom.xml    latest posts with one tag, see tag_key
+
+`build_all` streams the published posts with server-side chunking and keeps
+only FEED_ITEMS entries per feed, so memory does not grow with the number
+of posts. `update_for_post` rewrites just the shards a changed post touches.
+
+A full rebuild writes a fresh directory next to FEEDS_ROOT and then points
+FEEDS_ROOT, a symlink, at it with a single rename, so requests never find
+the tree missing. Writers hold `feeds_lock`: update_feeds tasks wait for a
+running rebuild and then apply their change to the new tree.
+"""
+import fcntl
+import glob
+import gzip
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from contextlib import contextmanager
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import BlogPost, PostTag, split_tags, sync_post_tags
+
+SITEMAP_SHARD_SIZE = 50000
+FEED_ITEMS = 20
+FEED_FIELDS = ('id', 'slug', 'title', 'excerpt', 'tags', 'published_at', 'updated_at', 'author__username')
+SHARD_NAME_RE = re.compile(r'^posts-(\d+)\.xml$')
+
+
+def post_url(slug):
+    return settings.SITE_URL.rstrip('/') + reverse('post-detail', kwargs={'slug': slug})
+
+
+def feed_url(relative_path):
+    return settings.SITE_URL.rstrip('/') + reverse('feed-file', kwargs={'path': relative_path})
+
+
+def tag_key(tag):
+    """
+    Directory name of a tag's feeds. Tags match case-insensitively; a tag its
+    slug does not spell exactly (``c++``, ``C#``, ``machine learning``) gets a
+    hash suffix, so ``c``, ``c++`` and ``c#`` do not share a feed.
+    """
+    tag = tag.lower()
+    tag_slug = slugify(tag)
+    if tag_slug == tag:
+        return tag_slug
+    digest = hashlib.md5(tag.encode('utf-8')).hexdigest()[:8]
+    return f'{tag_slug}-{digest}' if tag_slug else digest
+
+
+def tag_title(tag, rows):
+    """Feed title spelling the tag as the newest post in it does"""
+    for name in split_tags(rows[0]['tags']):
+        if name.lower() == tag.lower():
+            return f'Posts tagged {name}'
+    return f'Posts tagged {tag}'
+
+
+class FeedWriter:
+    """Write a file and its .gz twin side by side, replacing both atomically."""
+
+    def __init__(self, root, relative_path):
+        self.path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        self.plain = open(self.tmp_path, 'wb')
+        self.compressed = gzip.open(f'{self.tmp_path}.gz', 'wb', compresslevel=9)
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.plain.write(data)
+        self.compressed.write(data)
+
+    def close(self):
+        self.plain.close()
+        self.compressed.close()
+        os.replace(f'{self.tmp_path}.gz', f'{self.path}.gz')
+        os.replace(self.tmp_path, self.path)
+
+
+def write_file(root, relative_path, chunks):
+    writer = FeedWriter(root, relative_path)
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.close()
+
+
+def remove_file(root, relative_path):
+    for path in (os.path.join(root, relative_path), os.path.join(root, relative_path) + '.gz'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@contextmanager
+def feeds_lock(root):
+    """Exclusive across processes; held by everything that writes under ``root``"""
+    os.makedirs(os.path.dirname(root), exist_ok=True)
+    with open(f'{root}.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+# Rendering
+
+def sitemap_entry(row):
+    return (
+        f'<url><loc>{escape(post_url(row["slug"]))}</loc>'
+        f'<lastmod>{row["updated_at"].isoformat()}</lastmod></url>\n'
+    )
+
+
+def render_sitemap_index(shards):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for shard in shards:
+        yield f'<sitemap><loc>{escape(feed_url(f"sitemaps/posts-{shard}.xml"))}</loc></sitemap>\n'
+    yield '</sitemapindex>\n'
+
+
+def render_rss(title, link, rows):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"><channel>\n'
+    )
+    yield f'<title>{escape(title)}</title><link>{escape(link)}</link><description>{escape(title)}</description>\n'
+    for row in rows:
+        url = escape(post_url(row['slug']))
+        yield (
+            f'<item><title>{escape(row["title"])}</title><link>{url}</link>'
+            f'<guid isPermaLink="true">{url}</guid>'
+            f'<pubDate>{format_datetime(row["published_at"])}</pubDate>'
+            f'<dc:creator>{escape(row["author__username"])}</dc:creator>'
+            f'<description>{escape(row["excerpt"])}</description>'
+        )
+        for tag in split_tags(row['tags']):
+            yield f'<category>{escape(tag)}</category>'
+        yield '</item>\n'
+    yield '</channel></rss>\n'
+
+
+def render_atom(title, link, self_link, rows):
+    updated = max((row['updated_at'] for row in rows), default=timezone.now())
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+    yield (
+        f'<title>{escape(title)}</title><id>{escape(self_link)}</id>'
+        f'<link href={quoteattr(link)}/><link rel="self" href={quoteattr(self_link)}/>'
+        f'<updated>{updated.isoformat()}</updated>\n'
+    )
+    for row in rows:
+        url = post_url(row['slug'])
+        yield (
+            f'<entry><title>{escape(row["title"])}</title><id>{escape(url)}</id>'
+            f'<link href={quoteattr(url)}/>'
+            f'<published>{row["published_at"].isoformat()}</published>'
+            f'<updated>{row["updated_at"].isoformat()}</updated>'
+            f'<author><name>{escape(row["author__username"])}</name></author>'
+            f'<summary>{escape(row["excerpt"])}</summary>'
+        )
+        for tag in split_tags(row['tags']):
+            yield f'<category term={quoteattr(tag)}/>'
+        yield '</entry>\n'
+    yield '</feed>\n'
+
+
+def write_feed_pair(root, directory, title, rows):
+    prefix = f'{directory}/' if directory else ''
+    link = settings.SITE_URL
+    write_file(root, f'{prefix}rss.xml', render_rss(title, link, rows))
+    write_file(root, f'{prefix}atom.xml', render_atom(title, link, feed_url(f'{prefix}atom.xml'), rows))
+
+
+# Queries
+
+def published_posts():
+    return BlogPost.objects.filter(status='published', published_at__isnull=False)
+
+
+def latest(queryset):
+    return list(queryset.order_by('-published_at').values(*FEED_FIELDS)[:FEED_ITEMS])
+
+
+def tag_queryset(tag):
+    # The newest FEED_ITEMS off the PostTag index instead of scanning the tags column
+    newest = PostTag.objects.filter(tag=tag.lower()).order_by('-published_at').values('post_id')[:FEED_ITEMS]
+    return published_posts().filter(pk__in=newest)
+
+
+def shard_of(post_id):
+    return post_id // SITEMAP_SHARD_SIZE
+
+
+def existing_shards(root):
+    directory = os.path.join(root, 'sitemaps')
+    if not os.path.isdir(directory):
+        return []
+    shards = (SHARD_NAME_RE.match(name) for name in os.listdir(directory))
+    return sorted(int(match.group(1)) for match in shards if match)
+
+
+# Incremental updates
+
+def write_sitemap_shard(root, shard):
+    start = shard * SITEMAP_SHARD_SIZE
+    rows = published_posts().filter(id__gte=start, id__lt=start + SITEMAP_SHARD_SIZE).order_by('id')
+    relative_path = f'sitemaps/posts-{shard}.xml'
+    if not rows.exists():
+        remove_file(root, relative_path)
+        return
+
+    def chunks():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        for row in rows.values('slug', 'updated_at').iterator(chunk_size=2000):
+            yield sitemap_entry(row)
+        yield '</urlset>\n'
+    write_file(root, relative_path, chunks())
+
+
+def update_for_post(post_id, author_id, tags):
+    """
+    Rewrite only what a created, edited, published or deleted post affects:
+    its sitemap shard and the index, the site feeds, its author's feeds and
+    the feeds of ``tags`` (pass both the old and the new tags after an edit).
+    """
+    root = os.path.abspath(settings.FEEDS_ROOT)
+    # The tag index follows the post here rather than in its save, like the feeds
+    sync_post_tags(list(BlogPost.objects.filter(pk=post_id).only('id', 'tags', 'status', 'published_at')))
+    with feeds_lock(root):
+        _update_files(root, post_id, author_id, tags)
+
+
+def _update_files(root, post_id, author_id, tags):
+    write_sitemap_shard(root, shard_of(post_id))
+    write_file(root, 'sitemap.xml', render_sitemap_index(existing_shards(root)))
+    write_feed_pair(root, '', 'Latest posts', latest(published_posts()))
+
+    author_rows = latest(published_posts().filter(author_id=author_id))
+    if author_rows:
+        title = f'Posts by {author_rows[0]["author__username"]}'
+        write_feed_pair(root, f'authors/{author_id}', title, author_rows)
+    else:
+        shutil.rmtree(os.path.join(root, 'authors', str(author_id)), ignore_errors=True)
+
+    for tag in {tag.lower() for tag in tags}:
+        tag_rows = latest(tag_queryset(tag))
+        if tag_rows:
+            write_feed_pair(root, f'tags/{tag_key(tag)}', tag_title(tag, tag_rows), tag_rows)
+        else:
+            shutil.rmtree(os.path.join(root, 'tags', tag_key(tag)), ignore_errors=True)
+
+
+# Full rebuild
+
+def build_all(batch_size=2000):
+    """
+    Regenerate every file from scratch in a staging directory, then swap it in.
+
+    Posts are streamed twice: once by id for the sitemap shards, once newest
+    first to fill the per-author and per-tag feeds. Feeds stop accepting rows
+    after FEED_ITEMS, so memory is bounded by (authors + tags) x FEED_ITEMS.
+    Holds `feeds_lock` throughout, so no update is written to the old tree
+    after this build read past it. Returns counts of what was written.
+    """
+    root = os.path.abspath(settings.FEEDS_ROOT)
+    with feeds_lock(root):
+        current = os.path.realpath(root)
+        # Left behind by a build that crashed
+        for stale in glob.glob(f'{root}.build-*'):
+            if os.path.islink(stale):
+                os.remove(stale)
+            elif stale != current:
+                shutil.rmtree(stale, ignore_errors=True)
+        staging = tempfile.mkdtemp(prefix=f'{os.path.basename(root)}.build-', dir=os.path.dirname(root))
+        os.chmod(staging, 0o755)
+        try:
+            counts = _build_files(staging, batch_size)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        swap_in(root, staging)
+    return counts
+
+
+def swap_in(root, build):
+    """Atomically make the symlink ``root`` point at the directory ``build``"""
+    link = f'{build}.link'
+    os.symlink(os.path.basename(build), link)
+    if os.path.islink(root):
+        old = os.path.realpath(root)
+    elif os.path.isdir(root):
+        # FEEDS_ROOT is still a plain directory from before the first rebuild;
+        # this one time it is missing between the two renames
+        old = f'{root}.previous'
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(root, old)
+    else:
+        old = None
+    os.replace(link, root)
+    if old is not None and old != build:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def _build_files(staging, batch_size):
+    shards = []
+    writer = None
+    current = None
+    posts = 0
+    for row in published_posts().order_by('id').values('id', 'slug', 'updated_at').iterator(chunk_size=batch_size):
+        shard = shard_of(row['id'])
+        if shard != current:
+            if writer is not None:
+                writer.write('</urlset>\n')
+                writer.close()
+            writer = FeedWriter(staging, f'sitemaps/posts-{shard}.xml')
+            writer.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            writer.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            shards.append(shard)
+            current = shard
+        writer.write(sitemap_entry(row))
+        posts += 1
+    if writer is not None:
+        writer.write('</urlset>\n')
+        writer.close()
+    write_file(staging, 'sitemap.xml', render_sitemap_index(shards))
+
+    site_rows, author_rows, tag_rows = [], {}, {}
+    newest_first = published_posts().order_by('-published_at').values('author_id', *FEED_FIELDS)
+    for row in newest_first.iterator(chunk_size=batch_size):
+        if len(site_rows) < FEED_ITEMS:
+            site_rows.append(row)
+        rows = author_rows.setdefault(row['author_id'], [])
+        if len(rows) < FEED_ITEMS:
+            rows.append(row)
+        for tag in {tag.lower() for tag in split_tags(row['tags'])}:
+            rows = tag_rows.setdefault(tag, [])
+            if len(rows) < FEED_ITEMS:
+                rows.append(row)
+
+    write_feed_pair(staging, '', 'Latest posts', site_rows)
+    for author_id, rows in author_rows.items():
+        write_feed_pair(staging, f'authors/{author_id}', f'Posts by {rows[0]["author__username"]}', rows)
+    for tag, rows in tag_rows.items():
+        write_feed_pair(staging, f'tags/{tag_key(tag)}', tag_title(tag, rows), rows)
+
+    return {'posts': posts, 'shards': len(shards), 'authors': len(author_rows), 'tags': len(tag_rows)}
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from blog_backend.db_router import primary_reads
+from blog import archive
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Move archived (and optionally long-inactive) posts into the compressed "
+        "cold-storage table and report how much the hot table and its indexes shrank."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inactive-days', type=int,
+            help='Also archive posts not updated for this many days',
+        )
+        parser.add_argument(
+            '--max-views', type=int,
+            help='With --inactive-days, only archive stale posts with at most this many views',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the candidates')
+        parser.add_argument(
+            '--vacuum-full', action='store_true',
+            help='Run VACUUM FULL on the hot table afterwards so the freed space is '
+                 'returned to the OS (PostgreSQL only, takes an exclusive lock)',
+        )
+
+    def handle(self, *args, **options):
+        candidates = archive.archive_candidates(options['inactive_days'], options['max_views'])
+        if options['dry_run']:
+            with primary_reads():
+                self.stdout.write(f"{candidates.count()} post(s) would be archived")
+            return
+
+        before = archive.table_sizes()
+        with primary_reads():
+            archived, skipped = archive.archive_posts(candidates, batch_size=options['batch_size'])
+        if options['vacuum_full'] and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'VACUUM FULL ANALYZE {connection.ops.quote_name(archive.BlogPost._meta.db_table)}')
+        after = archive.table_sizes()
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} post(s)"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {skipped} post(s) whose slug is already used by an archived post"
+            ))
+        if before is None:
+            self.stdout.write("Table size report is only available on PostgreSQL")
+            return
+        for table in before:
+            for part in ('table', 'indexes', 'total'):
+                delta = after[table][part] - before[table][part]
+                self.stdout.write(
+                    f"{table:>20} {part:>8}: {format_bytes(before[table][part]):>10} -> "
+                    f"{format_bytes(after[table][part]):>10} ({'+' if delta >= 0 else '-'}{format_bytes(abs(delta))})"
+                )
+        if not options['vacuum_full']:
+            self.stdout.write(
+                "Deleted rows are reused by later inserts; pass --vacuum-full to shrink the files now"
+            )
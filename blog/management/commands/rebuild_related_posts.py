@@ -0,0 +1,75 @@
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from blog_backend.db_router import primary_reads
+from blog import related
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the related-posts table from scratch for every published post. "
+        "With --benchmark N, time the same pipeline on N synthetic posts without "
+        "touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.RELATED_POSTS_COUNT)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--benchmark', type=int, metavar='N',
+            help='Run on N generated posts (e.g. 100000) and report timings only',
+        )
+
+    def handle(self, *args, **options):
+        timings = []
+
+        def timed(label, fn):
+            started = time.perf_counter()
+            result = fn()
+            timings.append((label, time.perf_counter() - started))
+            return result
+
+        started = timezone.now()
+        if options['benchmark']:
+            documents = timed('generate', lambda: list(synthetic_documents(options['benchmark'])))
+        else:
+            with primary_reads():
+                documents = timed('load', lambda: list(related.published_documents()))
+
+        index = timed('vectorize', lambda: related.SimilarityIndex.build(documents))
+        neighbours = timed('neighbours', lambda: related.compute_all_neighbours(index, options['top_k']))
+
+        if not options['benchmark']:
+            timed('write', lambda: related.write_related(
+                neighbours, replace_all=True, batch_size=options['batch_size']
+            ))
+            index.synced_at = started
+            related.set_index(index)
+
+        for label, seconds in timings:
+            self.stdout.write(f"{label:>12}: {seconds:8.2f}s")
+        total = sum(seconds for _, seconds in timings)
+        rate = len(documents) / total if total else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(documents)} posts, {len(index.vocabulary)} terms, "
+            f"{len(index.data)} nonzeros in {total:.2f}s ({rate:.0f} posts/s)"
+        ))
+
+
+def synthetic_documents(count, vocabulary_size=50000, words_per_post=400, seed=42):
+    """Zipf-distributed word counts and a few tags per post, shaped like real blog text."""
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(1 / np.arange(1, vocabulary_size + 1))
+    cumulative /= cumulative[-1]
+    for post_id in range(1, count + 1):
+        ranks, tfs = np.unique(
+            np.searchsorted(cumulative, rng.random(words_per_post)), return_counts=True
+        )
+        counts = Counter(dict(zip((f'w{rank}' for rank in ranks.tolist()), tfs.tolist())))
+        for tag in rng.choice(500, size=3, replace=False).tolist():
+            counts[f'tag:t{tag}'] += related.TAG_WEIGHT
+        yield post_id, counts
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from blog_backend.db_router import primary_reads
+from blog.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = (
+        "Render post content into sanitized HTML, plain text and excerpts. "
+        "Picks up posts that were too large to render inline and rows created "
+        "before the content pipeline existed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render every post, even when its content hash is unchanged',
+        )
+
+    def handle(self, *args, **options):
+        queryset = BlogPost.objects.all()
+        if not options['force']:
+            queryset = queryset.filter(content_hash='')
+
+        rendered = 0
+        with primary_reads():
+            for post in queryset.iterator(chunk_size=options['batch_size']):
+                if post.render_content(force=options['force']):
+                    post.save(update_fields=BlogPost.RENDERED_FIELDS)
+                    rendered += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} post(s)"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from blog_backend.db_router import primary_reads
+from blog import archive
+from blog.models import ArchivedPost
+
+
+class Command(BaseCommand):
+    help = "Move posts from cold storage back into the live posts table, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='Slugs of the archived posts to restore')
+        parser.add_argument('--author', type=int, help='Restore every archived post of this author id')
+        parser.add_argument('--all', action='store_true', help='Restore the whole archive')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            queryset = ArchivedPost.objects.all()
+        elif options['author'] is not None:
+            queryset = ArchivedPost.objects.filter(author_id=options['author'])
+        elif options['slugs']:
+            queryset = ArchivedPost.objects.filter(slug__in=options['slugs'])
+        else:
+            raise CommandError("Give one or more slugs, --author or --all")
+
+        with primary_reads():
+            restored, skipped = archive.restore_posts(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} post(s)"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {skipped} post(s) whose slug is now used by a live post"
+            ))
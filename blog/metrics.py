@@ -0,0 +1,41 @@
+"""
+In-process counters for operational metrics.
+
+Counters are kept per worker process (like a Prometheus client registry) so
+incrementing them never costs a network round trip on the request path. The
+`metrics` endpoint reports the snapshot of the process that served it,
+tagged with its pid so a scraper can sum across workers.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_started_at = time.time()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    with _lock:
+        return _counters[name]
+
+
+def snapshot():
+    with _lock:
+        counters = dict(sorted(_counters.items()))
+    return {
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - _started_at, 1),
+        'counters': counters,
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
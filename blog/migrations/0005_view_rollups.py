@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_archivedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day')),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('author_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day')),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('post_id', models.BigIntegerField()),
+                ('author_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour or day')),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('tag', models.CharField(max_length=200)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tagviewrollup',
+            constraint=models.UniqueConstraint(fields=('tag', 'period', 'bucket'), name='blog_tagviewrollup_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='postviewrollup',
+            index=models.Index(fields=['author_id', 'period', 'bucket'], name='blog_postviewrollup_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postviewrollup',
+            constraint=models.UniqueConstraint(fields=('post_id', 'period', 'bucket'), name='blog_postviewrollup_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='authorviewrollup',
+            constraint=models.UniqueConstraint(fields=('author_id', 'period', 'bucket'), name='blog_authorviewrollup_uniq'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_post_tags(apps, schema_editor):
+    BlogPost = apps.get_model('blog', 'BlogPost')
+    PostTag = apps.get_model('blog', 'PostTag')
+    published = (
+        BlogPost.objects.filter(status='published', published_at__isnull=False)
+        .exclude(tags='').values_list('id', 'tags', 'published_at')
+    )
+    batch = []
+    for post_id, tags, published_at in published.iterator(chunk_size=2000):
+        names = {tag.strip().lower() for tag in tags.split(',')} - {''}
+        batch.extend(PostTag(post_id=post_id, tag=tag, published_at=published_at) for tag in names)
+        if len(batch) >= 2000:
+            PostTag.objects.bulk_create(batch)
+            batch = []
+    PostTag.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_view_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(help_text='Lowercased', max_length=200)),
+                ('published_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_entries', to='blog.blogpost'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-published_at'], name='blog_posttag_tag_latest_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('post', 'tag'), name='blog_posttag_post_tag_uniq'),
+        ),
+        migrations.RunPython(fill_post_tags, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,23 @@
 from django.db import models
 from django.conf import settings
 from django.utils.text import slugify
+from taskqueue.queue import enqueue
+from .content import content_hash, make_excerpt, render_content
+
+
+def split_tags(tags):
+    return [tag.strip() for tag in tags.split(',') if tag.strip()]
+
+
+def sync_post_tags(posts):
+    """Rewrite the PostTag rows of ``posts`` from their current tags and status"""
+    PostTag.objects.filter(post_id__in=[post.pk for post in posts]).delete()
+    PostTag.objects.bulk_create([
+        PostTag(post_id=post.pk, tag=tag, published_at=post.published_at)
+        for post in posts
+        if post.status == 'published' and post.published_at is not None
+        for tag in {tag.lower() for tag in post.tag_list}
+    ])
 
 
 class BlogPost(models.Model):
@@ -14,6 +31,9 @@ class BlogPost(models.Model):
     slug = models.SlugField(unique=True, blank=True)
     content = models.TextField()
     excerpt = models.TextField(max_length=300, blank=True)
+    content_html = models.TextField(blank=True, editable=False)
+    content_text = models.TextField(blank=True, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     featured_image = models.URLField(blank=True)
@@ -26,17 +46,166 @@ class BlogPost(models.Model):
     class Meta:
         ordering = ['-created_at']
     
+    RENDERED_FIELDS = ['content_html', 'content_text', 'content_hash', 'excerpt']
+    
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
-        if not self.excerpt and self.content:
-            self.excerpt = self.content[:297] + "..." if len(self.content) > 300 else self.content
+            self.slug = base = slugify(self.title)
+            # Archived posts keep their slugs, which archiving this post would collide with
+            suffix = 2
+            while ArchivedPost.objects.filter(slug=self.slug).exists():
+                self.slug = f'{base}-{suffix}'
+                suffix += 1
+        update_fields = kwargs.get('update_fields')
+        deferred = False
+        if update_fields is None or 'content' in update_fields:
+            if len(self.content) <= settings.CONTENT_INLINE_RENDER_LIMIT:
+                self.render_content()
+            elif self.content_hash != content_hash(self.content):
+                # Rendered by the blog.tasks.render_post task queued below; until
+                # then nothing derived from the previous content may be served
+                if self.has_generated_excerpt():
+                    self.excerpt = ''
+                self.content_html = ''
+                self.content_text = ''
+                self.content_hash = ''
+                deferred = True
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(self.RENDERED_FIELDS)
         super().save(*args, **kwargs)
+        if deferred:
+            enqueue('blog.tasks.render_post', self.pk, dedupe_key=f'render:{self.pk}')
+    
+    def render_content(self, force=False):
+        """Refresh the rendered fields, skipping content whose hash is unchanged"""
+        digest = content_hash(self.content)
+        if digest == self.content_hash and not force:
+            return False
+        rendered = render_content(self.content)
+        if self.has_generated_excerpt():
+            self.excerpt = rendered.excerpt
+        self.content_html = rendered.html
+        self.content_text = rendered.text
+        self.content_hash = rendered.hash
+        return True
+    
+    def has_generated_excerpt(self):
+        """Whether the excerpt is ours to replace, i.e. not written by the author"""
+        return (
+            not self.excerpt
+            or self.excerpt == make_excerpt(self.content_text)
+            # What save() filled in before posts were rendered, on rows not yet backfilled
+            or self.excerpt in (self.content, self.content[:297] + '...')
+        )
     
     def __str__(self):
         return self.title
     
     @property
     def tag_list(self):
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return split_tags(self.tags)
+
+
 
+class RelatedPost(models.Model):
+    """Precomputed nearest neighbours of a post, see blog.related"""
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['post', 'rank']
+        constraints = [
+            # Also the index behind the related-posts lookup
+            models.UniqueConstraint(fields=['post', 'rank'], name='blog_relatedpost_post_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id} ({self.score:.3f})'
+
+
+class PostTag(models.Model):
+    """
+    One row per tag of a published post, so the newest posts with a tag are an
+    index range scan. Kept in step by blog.feeds.update_for_post in the worker.
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='tag_entries')
+    tag = models.CharField(max_length=200, help_text="Lowercased")
+    published_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='blog_posttag_post_tag_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-published_at'], name='blog_posttag_tag_latest_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.post_id}: {self.tag}'
+
+
+class ArchivedPost(models.Model):
+    """Compressed cold-storage copy of a post moved out of BlogPost, see blog.archive"""
+    post_id = models.BigIntegerField(unique=True, help_text="Primary key the post had in BlogPost")
+    slug = models.SlugField(unique=True)
+    title = models.CharField(max_length=200)
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_posts')
+    status = models.CharField(max_length=10, choices=BlogPost.STATUS_CHOICES)
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return self.title
+
+
+class ViewRollup(models.Model):
+    """Views counted in one hour or day (UTC), written in bulk by blog.analytics"""
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField(help_text="Start of the hour or day")
+    views = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+
+
+class PostViewRollup(ViewRollup):
+    # Plain ids rather than foreign keys: history outlives archived and deleted posts
+    post_id = models.BigIntegerField()
+    author_id = models.BigIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post_id', 'period', 'bucket'], name='blog_postviewrollup_uniq'),
+        ]
+        indexes = [
+            # Top posts of one author over a time range
+            models.Index(fields=['author_id', 'period', 'bucket'], name='blog_postviewrollup_author_idx'),
+        ]
+
+
+class AuthorViewRollup(ViewRollup):
+    author_id = models.BigIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['author_id', 'period', 'bucket'], name='blog_authorviewrollup_uniq'),
+        ]
+
+
+class TagViewRollup(ViewRollup):
+    tag = models.CharField(max_length=200)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'period', 'bucket'], name='blog_tagviewrollup_uniq'),
+        ]
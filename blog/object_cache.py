@@ -0,0 +1,209 @@
+"""
+Two-tier object cache for serialized post payloads.
+
+Tier one is a per-process LRU bounded by entry count and TTL, so the hottest
+posts are served without a network hop. Tier two is the shared Django cache,
+so a post rendered by one worker is reused by all of them. Writes go through
+both tiers (`set`) as soon as a post or its author changes. Other processes'
+LRUs are not notified, which is why the local TTL is kept short. Misses are
+loaded from the primary: a replica lagging behind a delete or an edit would
+otherwise put the old post back for the whole shared TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from blog_backend.db_router import primary_reads
+
+from . import metrics
+from .models import BlogPost
+from .serializers import BlogPostSerializer
+from .singleflight import SingleFlight
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache:
+    def __init__(self, name, local_maxsize, local_ttl, shared_ttl):
+        self.name = name
+        self.local = LRUCache(local_maxsize, local_ttl)
+        self.shared_ttl = shared_ttl
+        self._flight = SingleFlight()
+
+    def shared_key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.incr(f'{self.name}.local_hit')
+            return value
+        value = cache.get(self.shared_key(key), _MISSING)
+        if value is not _MISSING:
+            metrics.incr(f'{self.name}.shared_hit')
+            self.local.set(key, value)
+            return value
+        metrics.incr(f'{self.name}.miss')
+        return _MISSING
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+
+        def load():
+            with primary_reads():
+                value = loader()
+            self.set(key, value)
+            return value
+        return self._flight.do(key, load)
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        cache.set(self.shared_key(key), value, self.shared_ttl)
+
+    def set_many(self, values):
+        for key, value in values.items():
+            self.local.set(key, value)
+        cache.set_many({self.shared_key(key): value for key, value in values.items()}, self.shared_ttl)
+
+    def cached_keys(self, keys):
+        """The subset of ``keys`` present in the shared tier."""
+        found = cache.get_many([self.shared_key(key) for key in keys])
+        prefix = len(self.shared_key(''))
+        return {shared_key[prefix:] for shared_key in found}
+
+    def delete(self, key):
+        self.local.delete(key)
+        cache.delete(self.shared_key(key))
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many([self.shared_key(key) for key in keys])
+
+    def stats(self):
+        return {
+            'local_size': len(self.local),
+            'local_maxsize': self.local.maxsize,
+            'local_ttl': self.local.ttl,
+            'shared_ttl': self.shared_ttl,
+            'local_hits': metrics.get(f'{self.name}.local_hit'),
+            'shared_hits': metrics.get(f'{self.name}.shared_hit'),
+            'misses': metrics.get(f'{self.name}.miss'),
+        }
+
+
+post_detail_cache = TieredCache(
+    'post-detail',
+    local_maxsize=settings.POST_CACHE_LOCAL_SIZE,
+    local_ttl=settings.POST_CACHE_LOCAL_TTL,
+    shared_ttl=settings.POST_CACHE_SHARED_TTL,
+)
+
+
+def serialize_post_detail(post):
+    return dict(BlogPostSerializer(post).data)
+
+
+def cache_post_detail(post, data=None):
+    """Write-through after a post changed; pass ``data`` if it is already serialized."""
+    if not post.content_hash:
+        # Rendering is still queued (blog.tasks.render_post caches the post when done)
+        forget_post_detail(post.slug)
+        return
+    post_detail_cache.set(post.slug, dict(data) if data is not None else serialize_post_detail(post))
+
+
+def forget_post_detail(slug):
+    post_detail_cache.delete(slug)
+
+
+def view_count_key(post_id):
+    return f'post-views:{post_id}'
+
+
+def set_view_counts(counts):
+    """Publish views_count values just written by blog.analytics, see with_view_count"""
+    cache.set_many(
+        {view_count_key(post_id): views for post_id, views in counts.items()},
+        settings.POST_CACHE_SHARED_TTL,
+    )
+
+
+def with_view_count(data):
+    """
+    A cached payload with the latest flushed views_count. Views only reach the
+    database in bulk, so the payload's own count is as old as the payload.
+    """
+    views = cache.get(view_count_key(data['id']))
+    if views is None or views <= data['views_count']:
+        return data
+    return {**data, 'views_count': views}
+
+
+def refresh_author_posts(author):
+    """Re-render the cached payloads that embed ``author``'s profile."""
+    with primary_reads():
+        slugs = list(BlogPost.objects.filter(author=author).values_list('slug', flat=True))
+        cached = post_detail_cache.cached_keys(slugs)
+        post_detail_cache.delete_many(set(slugs) - cached)
+        if cached:
+            posts = list(BlogPost.objects.filter(author=author, slug__in=cached))
+            for post in posts:
+                post.author = author
+            post_detail_cache.set_many({post.slug: serialize_post_detail(post) for post in posts})
+
+
+# User fields that appear in cached post payloads (UserSerializer)
+AUTHOR_FIELDS = {'username', 'email', 'role', 'bio', 'avatar'}
+
+
+def author_saved(sender, instance, created, update_fields=None, **kwargs):
+    """post_save of the user model, whichever path (API, djoser, admin) saved the profile"""
+    if created or (update_fields is not None and not AUTHOR_FIELDS & set(update_fields)):
+        # New users have no posts; logins only touch last_login
+        return
+    transaction.on_commit(lambda: refresh_author_posts(instance))
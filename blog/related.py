@@ -0,0 +1,433 @@
+"""
+Related-posts engine.
+
+Published posts are turned into L2-normalised TF-IDF vectors (tags count as
+heavily weighted terms) held in a NumPy CSR matrix. Cosine similarity is
+computed with sparse arithmetic over an inverted (CSC) view of the matrix,
+and the top-K neighbours of each post are stored in `RelatedPost`, so
+serving `/posts/<slug>/related/` is a single indexed lookup.
+
+The vocabulary and IDF weights are fixed by the last full build
+(`manage.py rebuild_related_posts`). Between rebuilds, `refresh_post` slots a
+published or edited post into the in-memory index, rewrites its neighbour
+list and patches the lists of the posts it now belongs to (or no longer
+belongs to). Terms the vocabulary has not seen are ignored until the next
+full build.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BlogPost, RelatedPost
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:'[a-z]+)?")
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same
+she should so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours yourself
+yourselves also one like get got use used using make made way new
+""".split())
+TAG_WEIGHT = 3
+MAX_TERMS_PER_POST = 64
+# Terms in more than this share of posts say little about relatedness,
+# though small blogs keep every term shared by up to MIN_MAX_DF posts
+MAX_DF_RATIO = 0.2
+MIN_MAX_DF = 50
+# How many of the best-scoring posts get their lists patched on an update
+REVERSE_CANDIDATES = 200
+# Squeeze out the rows of replaced and withdrawn posts once they are this
+# share of the index (and at least COMPACT_MIN_DEAD rows)
+COMPACT_DEAD_RATIO = 0.2
+COMPACT_MIN_DEAD = 1000
+
+
+def extract_terms(tags, text):
+    """Term counts for one post: body words plus boosted ``tag:<name>`` terms."""
+    counts = Counter(
+        token for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 2 and token not in STOP_WORDS
+    )
+    for tag in tags.split(','):
+        tag = tag.strip().lower()
+        if tag:
+            counts[f'tag:{tag}'] += TAG_WEIGHT
+    return counts
+
+
+def _expand_ranges(starts, lengths):
+    """Concatenate ``arange(s, s + n)`` for every (s, n) without a Python loop."""
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(total, dtype=np.int64)
+
+
+def _reserve(buffer, needed):
+    """``buffer`` or a copy with room for ``needed`` items, grown geometrically so appends are amortised O(1)."""
+    if needed <= len(buffer):
+        return buffer
+    grown = np.empty(max(needed, len(buffer) + len(buffer) // 4 + 1024), dtype=buffer.dtype)
+    grown[:len(buffer)] = buffer
+    return grown
+
+
+class SimilarityIndex:
+    """
+    Row-normalised sparse TF-IDF matrix of the published posts.
+
+    Upserts append a row to spare capacity at the end of the arrays and mark
+    the post's previous row dead; once dead rows make up COMPACT_DEAD_RATIO of
+    the matrix they are squeezed out, so a long-lived worker's index stays
+    proportional to the number of published posts.
+    """
+
+    def __init__(self, vocabulary, idf):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.rows = 0
+        self.nnz = 0
+        self._post_ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = np.empty(0, dtype=np.int32)
+        self._data = np.empty(0, dtype=np.float32)
+        self._entry_rows = np.empty(0, dtype=np.int32)
+        self.row_of_post = {}
+        self.synced_at = None
+        self._postings = None
+
+    @classmethod
+    def build(cls, documents):
+        """Build from an iterable of ``(post_id, term_counts)``."""
+        documents = list(documents)
+        n = len(documents)
+        df = Counter()
+        for _, counts in documents:
+            df.update(counts.keys())
+        max_df = max(MIN_MAX_DF, int(MAX_DF_RATIO * n))
+        # A term found in a single post cannot relate it to anything
+        terms = [term for term, count in df.items() if 2 <= count <= max_df]
+        vocabulary = {term: column for column, term in enumerate(terms)}
+        doc_freq = np.array([df[term] for term in terms], dtype=np.float64)
+        idf = (np.log((1 + n) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        index = cls(vocabulary, idf)
+        vectors = [index.vectorize(counts) for _, counts in documents]
+        index._append_rows([post_id for post_id, _ in documents], vectors)
+        return index
+
+    # Views of the used part of the buffers
+    @property
+    def post_ids(self):
+        return self._post_ids[:self.rows]
+
+    @property
+    def alive(self):
+        return self._alive[:self.rows]
+
+    @property
+    def indptr(self):
+        return self._indptr[:self.rows + 1]
+
+    @property
+    def indices(self):
+        return self._indices[:self.nnz]
+
+    @property
+    def data(self):
+        return self._data[:self.nnz]
+
+    @property
+    def entry_rows(self):
+        return self._entry_rows[:self.nnz]
+
+    @property
+    def size(self):
+        return len(self.row_of_post)
+
+    @property
+    def dead_rows(self):
+        return self.rows - len(self.row_of_post)
+
+    def vectorize(self, counts):
+        columns, weights = [], []
+        for term, tf in counts.items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                columns.append(column)
+                weights.append((1 + math.log(tf)) * self.idf[column])
+        if not columns:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        columns = np.array(columns, dtype=np.int32)
+        weights = np.array(weights, dtype=np.float32)
+        if len(columns) > MAX_TERMS_PER_POST:
+            keep = np.argpartition(weights, -MAX_TERMS_PER_POST)[-MAX_TERMS_PER_POST:]
+            columns, weights = columns[keep], weights[keep]
+        weights /= np.sqrt(np.dot(weights, weights))
+        return columns, weights
+
+    def _append_rows(self, post_ids, vectors):
+        first_row, first_entry = self.rows, self.nnz
+        count = len(post_ids)
+        lengths = np.array([len(columns) for columns, _ in vectors], dtype=np.int64)
+        added = int(lengths.sum())
+        for offset, post_id in enumerate(post_ids):
+            previous = self.row_of_post.get(post_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self.row_of_post[post_id] = first_row + offset
+
+        self._post_ids = _reserve(self._post_ids, first_row + count)
+        self._alive = _reserve(self._alive, first_row + count)
+        self._indptr = _reserve(self._indptr, first_row + count + 1)
+        self._post_ids[first_row:first_row + count] = post_ids
+        self._alive[first_row:first_row + count] = True
+        self._indptr[first_row + 1:first_row + count + 1] = first_entry + np.cumsum(lengths)
+        if added:
+            end = first_entry + added
+            self._indices = _reserve(self._indices, end)
+            self._data = _reserve(self._data, end)
+            self._entry_rows = _reserve(self._entry_rows, end)
+            self._indices[first_entry:end] = np.concatenate([columns for columns, _ in vectors])
+            self._data[first_entry:end] = np.concatenate([weights for _, weights in vectors])
+            self._entry_rows[first_entry:end] = np.repeat(
+                np.arange(first_row, first_row + count, dtype=np.int32), lengths
+            )
+        self.rows += count
+        self.nnz += added
+        self._postings = None
+
+    def compact(self):
+        """Drop dead rows, renumbering the live ones; row numbers held by callers go stale."""
+        keep = np.flatnonzero(self.alive)
+        starts = self.indptr[keep]
+        lengths = self.indptr[keep + 1] - starts
+        positions = _expand_ranges(starts, lengths)
+        self._post_ids = self.post_ids[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._indptr = np.zeros(len(keep) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._indptr[1:])
+        self._indices = self.indices[positions]
+        self._data = self.data[positions]
+        self._entry_rows = np.repeat(np.arange(len(keep), dtype=np.int32), lengths)
+        self.rows, self.nnz = len(keep), len(positions)
+        self.row_of_post = {post_id: row for row, post_id in enumerate(self._post_ids.tolist())}
+        self._postings = None
+
+    def _compact_if_sparse(self):
+        if self.dead_rows > max(COMPACT_MIN_DEAD, COMPACT_DEAD_RATIO * self.rows):
+            self.compact()
+
+    def upsert(self, post_id, counts):
+        self._append_rows([post_id], [self.vectorize(counts)])
+        self._compact_if_sparse()
+        return self.row_of_post[post_id]
+
+    def remove(self, post_id):
+        row = self.row_of_post.pop(post_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._compact_if_sparse()
+
+    def row_vector(self, row):
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def scores(self, row):
+        """Cosine similarity of ``row`` against every row, by one pass over the nonzeros."""
+        columns, weights = self.row_vector(row)
+        query = np.zeros(len(self.vocabulary), dtype=np.float32)
+        query[columns] = weights
+        scores = np.bincount(
+            self.entry_rows, weights=self.data * query[self.indices], minlength=len(self.post_ids)
+        )
+        scores[~self.alive] = 0
+        scores[row] = 0
+        return scores
+
+    def _build_postings(self):
+        order = np.argsort(self.indices, kind='stable')
+        counts = np.bincount(self.indices, minlength=len(self.vocabulary))
+        column_ptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(counts, out=column_ptr[1:])
+        self._postings = (column_ptr, self.entry_rows[order], self.data[order])
+
+    def neighbours(self, row, k):
+        """Top-``k`` ``(post_id, score)`` for one row, touching only rows that share a term."""
+        if self._postings is None:
+            self._build_postings()
+        column_ptr, posting_rows, posting_data = self._postings
+        columns, weights = self.row_vector(row)
+        starts = column_ptr[columns]
+        lengths = column_ptr[columns + 1] - starts
+        positions = _expand_ranges(starts, lengths)
+        if not len(positions):
+            return []
+        candidates, inverse = np.unique(posting_rows[positions], return_inverse=True)
+        scores = np.bincount(inverse, weights=posting_data[positions] * np.repeat(weights, lengths))
+        valid = self.alive[candidates] & (candidates != row)
+        return self._top_k(candidates[valid], scores[valid], k)
+
+    def top_k_from_scores(self, scores, k):
+        candidates = np.flatnonzero(scores > 0)
+        return self._top_k(candidates, scores[candidates], k)
+
+    def _top_k(self, rows, scores, k):
+        if len(rows) > k:
+            keep = np.argpartition(scores, -k)[-k:]
+            rows, scores = rows[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')
+        return [(int(self.post_ids[rows[i]]), float(scores[i])) for i in order]
+
+
+def published_documents(batch_size=2000):
+    rows = (
+        BlogPost.objects.filter(status='published')
+        .values_list('id', 'tags', 'content_text')
+        .iterator(chunk_size=batch_size)
+    )
+    for post_id, tags, text in rows:
+        yield post_id, extract_terms(tags, text)
+
+
+def build_index():
+    started = timezone.now()
+    index = SimilarityIndex.build(published_documents())
+    index.synced_at = started
+    return index
+
+
+def write_related(neighbours, replace_all=False, batch_size=5000):
+    """Replace the stored neighbour lists of every post in ``neighbours``."""
+    def entries():
+        for post_id, related in neighbours.items():
+            for rank, (related_id, score) in enumerate(related):
+                yield RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+
+    with transaction.atomic():
+        if replace_all:
+            RelatedPost.objects.all().delete()
+        else:
+            post_ids = list(neighbours)
+            for start in range(0, len(post_ids), batch_size):
+                RelatedPost.objects.filter(post_id__in=post_ids[start:start + batch_size]).delete()
+        batch = []
+        for entry in entries():
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                RelatedPost.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            RelatedPost.objects.bulk_create(batch)
+
+
+def compute_all_neighbours(index, k):
+    return {
+        post_id: index.neighbours(row, k)
+        for post_id, row in index.row_of_post.items()
+    }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """The process-wide index, built on first use and caught up with recent edits."""
+    global _index
+    if _index is None:
+        _index = build_index()
+        return _index
+    synced_at = timezone.now()
+    changed = BlogPost.objects.filter(updated_at__gt=_index.synced_at).values_list(
+        'id', 'status', 'tags', 'content_text'
+    )
+    for post_id, status, tags, text in changed:
+        if status == 'published':
+            _index.upsert(post_id, extract_terms(tags, text))
+        else:
+            _index.remove(post_id)
+    _index.synced_at = synced_at
+    return _index
+
+
+def set_index(index):
+    global _index
+    with _index_lock:
+        _index = index
+
+
+def refresh_post(post_id):
+    """
+    Incrementally update the related lists after ``post_id`` was published, edited or withdrawn.
+
+    Only called from the blog.tasks.refresh_related task: the first call in a
+    process builds the whole index, which must never happen inside a request.
+    """
+    k = settings.RELATED_POSTS_COUNT
+    post = BlogPost.objects.filter(pk=post_id, status='published').values_list('tags', 'content_text').first()
+    listing = set(RelatedPost.objects.filter(related_id=post_id).values_list('post_id', flat=True))
+    with _index_lock:
+        index = get_index()
+        own, score_by_post = None, {}
+        if post is None:
+            index.remove(post_id)
+        else:
+            row = index.upsert(post_id, extract_terms(*post))
+            scores = index.scores(row)
+            own = index.top_k_from_scores(scores, k)
+            score_by_post = dict(index.top_k_from_scores(scores, REVERSE_CANDIDATES))
+        # Lists the post drops out of are refilled from the index, not left a
+        # post short until the next full rebuild
+        recomputed = {
+            owner_id: index.neighbours(index.row_of_post[owner_id], k)
+            for owner_id in listing - set(score_by_post)
+            if owner_id in index.row_of_post
+        }
+
+    affected = set(score_by_post) | listing
+    current = {}
+    for owner_id, related_id, score in RelatedPost.objects.filter(post_id__in=affected).values_list(
+        'post_id', 'related_id', 'score'
+    ):
+        current.setdefault(owner_id, []).append((related_id, score))
+
+    # Rows deleted by other processes may still be in this process's index
+    listed = affected | {related_id for related_id, _ in own or []} | {
+        related_id for entries in recomputed.values() for related_id, _ in entries
+    }
+    published = set(
+        BlogPost.objects.filter(pk__in=listed, status='published').values_list('id', flat=True)
+    )
+
+    neighbours = {}
+    if own is not None:
+        neighbours[post_id] = [entry for entry in own if entry[0] in published]
+    for owner_id in affected & published:
+        if owner_id in recomputed:
+            entries = [entry for entry in recomputed[owner_id] if entry[0] in published]
+        else:
+            entries = [entry for entry in current.get(owner_id, []) if entry[0] != post_id]
+            if owner_id in score_by_post:
+                entries.append((post_id, score_by_post[owner_id]))
+            entries = sorted(entries, key=lambda entry: -entry[1])[:k]
+        if entries != sorted(current.get(owner_id, []), key=lambda entry: -entry[1]):
+            neighbours[owner_id] = entries
+    with transaction.atomic():
+        if post is None:
+            # No longer published: drop its own list and whatever still points at it
+            RelatedPost.objects.filter(post_id=post_id).delete()
+            RelatedPost.objects.filter(related_id=post_id).delete()
+        write_related(neighbours)
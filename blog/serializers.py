@@ -1,8 +1,15 @@
 from rest_framework import serializers
-from .models import BlogPost
+from blog_backend.compiled_serializers import CompiledSerializer
+from .models import BlogPost, split_tags
 from users.serializers import UserSerializer
 
 
+def reading_time(content):
+    word_count = len(content.split())
+    minutes = max(1, round(word_count / 200))
+    return f"{minutes} min read"
+
+
 class BlogPostSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     tag_list = serializers.ReadOnlyField()
@@ -11,18 +18,16 @@ class BlogPostSerializer(serializers.ModelSerializer):
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'slug', 'content', 'excerpt', 'author', 
+            'id', 'title', 'slug', 'content', 'content_html', 'excerpt', 'author', 
             'status', 'featured_image', 'tags', 'tag_list',
             'views_count', 'reading_time', 'created_at', 
             'updated_at', 'published_at'
         ]
-        read_only_fields = ['slug', 'author', 'views_count']
+        read_only_fields = ['slug', 'content_html', 'author', 'views_count']
     
     
     def get_reading_time(self, obj):
-        word_count = len(obj.content.split())
-        reading_time = max(1, round(word_count / 200))
-        return f"{reading_time} min read"
+        return reading_time(obj.content)
 
 class BlogPostListSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -37,9 +42,18 @@ class BlogPostListSerializer(serializers.ModelSerializer):
         ]
     
     def get_reading_time(self, obj):
-        word_count = len(obj.content.split())
-        reading_time = max(1, round(word_count / 200))
-        return f"{reading_time} min read"
+        return reading_time(obj.content)
+
+
+# Serializes values_list rows to exactly what BlogPostListSerializer returns
+compiled_post_list = CompiledSerializer(
+    BlogPostListSerializer,
+    computed={
+        'tag_list': (['tags'], split_tags),
+        'reading_time': (['content'], reading_time),
+    },
+)
+
 
 class BlogPostCreateSerializer(serializers.ModelSerializer):
     """Simplified serializer for creating posts"""
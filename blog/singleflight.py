@@ -0,0 +1,115 @@
+"""
+Request coalescing for hot read paths.
+
+When a popular post's cache entry expires, every concurrent request misses at
+once and runs the same query. `cached_read` lets exactly one caller per key
+do the work: threads in the same process wait on the in-flight call, and
+other processes wait on a short-lived lock key in the shared cache and then
+read the value the leader stored.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.incr('singleflight.collapsed')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+_group = SingleFlight()
+
+
+def cache_key(prefix, *parts):
+    """Build a short, cache-safe key from arbitrary parts such as a full URL."""
+    digest = hashlib.md5('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def _wait_for_value(key, deadline):
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    return _MISSING
+
+
+def _load(key, fn, timeout):
+    # Another thread or process may have filled the key while we queued up
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.SINGLEFLIGHT_LOCK_TIMEOUT
+    locked = cache.add(lock_key, 1, lock_timeout)
+    if not locked:
+        # A different process is already computing this key
+        value = _wait_for_value(key, time.monotonic() + lock_timeout)
+        if value is not _MISSING:
+            metrics.incr('singleflight.collapsed')
+            return value
+        # The leader died or was too slow; fall through and compute ourselves,
+        # leaving whatever lock now exists to whoever took it
+
+    try:
+        metrics.incr('singleflight.executed')
+        value = fn()
+        cache.set(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def cached_read(key, fn, timeout=None):
+    """Return the cached value for ``key``, computing it at most once on a miss."""
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+    if timeout is None:
+        timeout = settings.READ_CACHE_TIMEOUT
+    return _group.do(key, lambda: _load(key, fn, timeout))
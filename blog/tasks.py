@@ -0,0 +1,70 @@
+"""
+Background side effects of post writes, run by `manage.py run_worker`.
+
+Write endpoints only save the post and queue these; see taskqueue.queue.
+"""
+import hashlib
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from taskqueue.queue import task
+
+from . import feeds, related
+from .models import BlogPost
+from .object_cache import cache_post_detail
+
+
+@task(priority=10)
+def send_notification(event_type, message):
+    """Real-time update for websocket clients in the blog_updates group"""
+    async_to_sync(get_channel_layer().group_send)(
+        'blog_updates', {'type': event_type, 'message': message}
+    )
+
+
+@task(priority=5)
+def render_post(post_id):
+    """Render content left unrendered by BlogPost.save, then refresh what shows it"""
+    try:
+        post = BlogPost.objects.select_related('author').get(pk=post_id)
+    except BlogPost.DoesNotExist:
+        return
+    if not post.render_content():
+        return
+    post.save(update_fields=BlogPost.RENDERED_FIELDS)
+    cache_post_detail(post)
+    # post_changed held these back while the text was missing
+    post_changed(post, post.tag_list)
+
+
+@task()
+def refresh_related(post_id):
+    related.refresh_post(post_id)
+
+
+@task()
+def update_feeds(post_id, author_id, tags):
+    feeds.update_for_post(post_id, author_id, tags)
+
+
+def post_changed(post, tags):
+    """
+    Queue the related-posts and feed refreshes for a post; ``tags`` as in
+    feeds.update_for_post. While the post waits for render_post, which calls
+    this again once the text exists, only the feeds of tags the post left are
+    refreshed, since those merely drop it.
+    """
+    if not post.content_hash:
+        tags = set(tags) - set(post.tag_list)
+        if not tags:
+            return
+    else:
+        refresh_related.enqueue(post.pk, dedupe_key=f'related:{post.pk}')
+    tags = sorted(set(tags))
+    digest = hashlib.md5(','.join(tags).encode('utf-8')).hexdigest()
+    update_feeds.enqueue(post.pk, post.author_id, tags, dedupe_key=f'feeds:{post.pk}:{digest}')
+
+
+def post_deleted(post_id, author_id, tags):
+    update_feeds.enqueue(post_id, author_id, sorted(set(tags)))
@@ -0,0 +1,672 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from users.models import User
+
+from . import analytics, archive, feeds, metrics, related, singleflight, throttling
+from .content import make_excerpt, render_content
+from .models import (
+    ArchivedPost, AuthorViewRollup, BlogPost, PostViewRollup, RelatedPost, TagViewRollup,
+)
+from .object_cache import LRUCache, TieredCache, post_detail_cache
+from .serializers import BlogPostListSerializer, compiled_post_list
+from .singleflight import SingleFlight
+
+
+class ContentSanitizerTests(SimpleTestCase):
+    def assertRenders(self, content, html, text):
+        rendered = render_content(content)
+        self.assertEqual(rendered.html, html)
+        self.assertEqual(rendered.text, text)
+
+    def test_void_embed_keeps_following_content(self):
+        self.assertRenders('<p>Intro</p><embed src="x"><p>Rest</p>', '<p>Intro</p><p>Rest</p>', 'Intro\nRest')
+
+    def test_self_closed_drop_tags_keep_following_content(self):
+        for tag in ('iframe', 'script', 'style', 'object', 'template'):
+            self.assertRenders(f'<p>Intro</p><{tag} src="x"/><p>Rest</p>', '<p>Intro</p><p>Rest</p>', 'Intro\nRest')
+
+    def test_drops_script_and_style_content(self):
+        self.assertRenders(
+            '<p>A</p><script>alert(1)</script><style>p {}</style><iframe>frame</iframe><p>B</p>',
+            '<p>A</p><p>B</p>', 'A\nB',
+        )
+
+    def test_nested_drop_tags(self):
+        self.assertRenders('<object><iframe>x</iframe>still hidden</object><p>B</p>', '<p>B</p>', 'B')
+
+    def test_strips_unsafe_attributes_and_urls(self):
+        self.assertRenders(
+            '<a href="javascript:alert(1)" onclick="x">link</a> <img src="https://x/y.png" onerror="x">',
+            '<a rel="nofollow noopener">link</a> <img src="https://x/y.png">', 'link',
+        )
+
+    def test_closes_unbalanced_tags(self):
+        self.assertRenders('<p><b>bold', '<p><b>bold</b></p>', 'bold')
+
+    def test_plain_text_paragraphs(self):
+        self.assertRenders('One\ntwo\n\nThree & <4', '<p>One<br>two</p><p>Three &amp; &lt;4</p>', 'One\ntwo\nThree & <4')
+
+    def test_excerpt_cuts_at_word_boundary(self):
+        excerpt = make_excerpt('word ' * 100)
+        self.assertLessEqual(len(excerpt), 300)
+        self.assertTrue(excerpt.endswith('word...'))
+
+
+class RenderContentTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+
+    def legacy_post(self, content, excerpt):
+        # As rows were before the content pipeline: unrendered, excerpt sliced from the raw content
+        post = BlogPost.objects.create(author=self.author, title='Legacy', content=content)
+        BlogPost.objects.filter(pk=post.pk).update(
+            excerpt=excerpt, content_html='', content_text='', content_hash='',
+        )
+        return post
+
+    def test_backfill_replaces_sliced_excerpt(self):
+        content = 'word ' * 100
+        post = self.legacy_post(content, content[:297] + '...')
+        call_command('render_content', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, make_excerpt(post.content_text))
+        self.assertFalse(post.excerpt.endswith('wo...'))
+
+    def test_backfill_keeps_written_excerpt(self):
+        post = self.legacy_post('word ' * 100, 'Written by hand')
+        call_command('render_content', stdout=io.StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.excerpt, 'Written by hand')
+        self.assertTrue(post.content_hash)
+
+
+class ArchiveSlugTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+
+    def post(self, **fields):
+        return BlogPost.objects.create(author=self.author, title='Same title', content='Body', **fields)
+
+    def test_new_post_does_not_reuse_archived_slug(self):
+        archive.archive_posts(BlogPost.objects.filter(pk=self.post(status='archived').pk))
+        self.assertEqual(self.post().slug, 'same-title-2')
+
+    def test_archiving_skips_slug_held_by_archived_post(self):
+        archive.archive_posts(BlogPost.objects.filter(pk=self.post(status='archived').pk))
+        # E.g. a post created before slugs were checked against the archive
+        live = self.post(slug='same-title', status='archived')
+
+        self.assertEqual(archive.archive_posts(archive.archive_candidates()), (0, 1))
+        self.assertTrue(BlogPost.objects.filter(pk=live.pk).exists())
+        self.assertEqual(ArchivedPost.objects.count(), 1)
+
+
+class TagFeedTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # build_all turns FEEDS_ROOT into a symlink to a directory next to it
+        self.root = os.path.join(directory, 'feeds')
+        override = override_settings(FEEDS_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+
+    def publish(self, title, tags):
+        return BlogPost.objects.create(
+            author=self.author, title=title, content='Body', tags=tags,
+            status='published', published_at=timezone.now(),
+        )
+
+    def tag_dirs(self):
+        return sorted(os.listdir(os.path.join(self.root, 'tags')))
+
+    def test_similar_tags_get_separate_feeds(self):
+        keys = {feeds.tag_key(tag) for tag in ('c', 'c++', 'C#')}
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(feeds.tag_key('Django'), 'django')
+
+    def test_incremental_and_full_rebuild_agree(self):
+        posts = [self.publish('One', 'C++, python'), self.publish('Two', 'c, Python'), self.publish('Three', 'c#')]
+        for post in posts:
+            feeds.update_for_post(post.pk, post.author_id, post.tag_list)
+        incremental = self.tag_dirs()
+        with open(os.path.join(self.root, 'tags', 'python', 'rss.xml')) as feed:
+            self.assertEqual(feed.read().count('<item>'), 2)
+
+        feeds.build_all()
+        self.assertEqual(self.tag_dirs(), incremental)
+        self.assertEqual(len(incremental), 4)
+
+    def test_unpublished_post_leaves_tag_feed(self):
+        post = self.publish('One', 'python')
+        feeds.update_for_post(post.pk, post.author_id, post.tag_list)
+        post.status = 'draft'
+        post.save()
+        feeds.update_for_post(post.pk, post.author_id, post.tag_list)
+        self.assertEqual(self.tag_dirs(), [])
+
+    def test_rebuild_swaps_the_tree_in_one_rename(self):
+        post = self.publish('One', 'python')
+        feeds.update_for_post(post.pk, post.author_id, post.tag_list)
+        self.assertFalse(os.path.islink(self.root))
+        feeds.build_all()
+        first = os.path.realpath(self.root)
+        feeds.build_all()
+        self.assertTrue(os.path.islink(self.root))
+        self.assertNotEqual(os.path.realpath(self.root), first)
+        self.assertEqual(
+            sorted(os.listdir(os.path.dirname(self.root))),
+            sorted(['feeds', 'feeds.lock', os.path.basename(os.path.realpath(self.root))]),
+        )
+
+        # Incremental updates land in the tree the link points at
+        second = self.publish('Two', 'web')
+        feeds.update_for_post(second.pk, second.author_id, second.tag_list)
+        self.assertEqual(self.tag_dirs(), ['python', 'web'])
+
+    def test_rebuild_failure_keeps_the_current_tree(self):
+        feeds.build_all()
+        current = os.path.realpath(self.root)
+        with mock.patch.object(feeds, 'render_sitemap_index', side_effect=OSError), self.assertRaises(OSError):
+            feeds.build_all()
+        self.assertEqual(os.path.realpath(self.root), current)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.root))), 3)
+
+    def test_writers_wait_for_the_lock(self):
+        acquired = threading.Event()
+
+        def update():
+            with feeds.feeds_lock(self.root):
+                acquired.set()
+
+        with feeds.feeds_lock(self.root):
+            thread = threading.Thread(target=update)
+            thread.start()
+            self.assertFalse(acquired.wait(0.1))
+        thread.join(5)
+        self.assertTrue(acquired.is_set())
+
+    def test_gzip_variant_keeps_the_file_name(self):
+        self.publish('One', 'python')
+        feeds.build_all()
+        response = self.client.get('/sitemap.xml', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Content-Disposition'], 'inline; filename="sitemap.xml"')
+        response.close()
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    def documents(self, count, version=0):
+        for post_id in range(count):
+            words = [f'w{post_id % 7}', f'w{post_id % 11}', f'v{version}w{post_id % 5}']
+            yield post_id, related.extract_terms(f'tag{post_id % 3}', ' '.join(words * 2))
+
+    def test_edits_keep_the_index_compact(self):
+        index = related.SimilarityIndex.build(self.documents(100))
+        for version in range(1, 60):
+            for post_id, counts in self.documents(100, version):
+                index.upsert(post_id, counts)
+        index.remove(0)
+        self.assertEqual(index.size, 99)
+        self.assertLessEqual(index.dead_rows, max(related.COMPACT_MIN_DEAD, related.COMPACT_DEAD_RATIO * index.rows))
+        self.assertLess(index.rows, 100 + related.COMPACT_MIN_DEAD * 2)
+
+    def test_neighbours_survive_compaction(self):
+        index = related.SimilarityIndex.build(self.documents(50))
+        for post_id, counts in self.documents(50):
+            index.upsert(post_id, counts)
+        index.remove(7)
+        before = {post_id: index.neighbours(row, 5) for post_id, row in index.row_of_post.items()}
+        index.compact()
+        self.assertEqual(index.dead_rows, 0)
+        after = {post_id: index.neighbours(row, 5) for post_id, row in index.row_of_post.items()}
+        self.assertEqual(after.keys(), before.keys())
+        for post_id in before:
+            self.assertEqual(
+                [(neighbour, round(score, 5)) for neighbour, score in after[post_id]],
+                [(neighbour, round(score, 5)) for neighbour, score in before[post_id]],
+            )
+            row = index.row_of_post[post_id]
+            self.assertEqual(
+                [neighbour for neighbour, _ in index.top_k_from_scores(index.scores(row), 5)],
+                [neighbour for neighbour, _ in after[post_id]],
+            )
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+        self.assertEqual(len(lru), 2)
+
+    def test_expires_after_ttl(self):
+        lru = LRUCache(maxsize=2, ttl=10)
+        with mock.patch('blog.object_cache.time.monotonic', return_value=100):
+            lru.set('a', 1)
+        with mock.patch('blog.object_cache.time.monotonic', return_value=109):
+            self.assertEqual(lru.get('a'), 1)
+        with mock.patch('blog.object_cache.time.monotonic', return_value=111):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru), 0)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache('test-tiered', local_maxsize=10, local_ttl=10, shared_ttl=60)
+
+    def test_loads_once_then_serves_both_tiers(self):
+        loader = mock.Mock(return_value={'v': 1})
+        self.assertEqual(self.tiered.get_or_load('k', loader), {'v': 1})
+        self.assertEqual(self.tiered.get_or_load('k', loader), {'v': 1})
+        loader.assert_called_once()
+        self.tiered.local.clear()
+        # Another process's view: only the shared tier has it
+        self.assertEqual(self.tiered.get_or_load('k', loader), {'v': 1})
+        loader.assert_called_once()
+        self.assertEqual(len(self.tiered.local), 1)
+
+    def test_write_through_and_delete(self):
+        self.tiered.set('k', 1)
+        self.assertEqual(cache.get(self.tiered.shared_key('k')), 1)
+        self.tiered.set_many({'k': 2, 'j': 3})
+        self.assertEqual(self.tiered.get('k'), 2)
+        self.assertEqual(self.tiered.cached_keys(['k', 'j', 'x']), {'k', 'j'})
+        self.tiered.delete_many(['k', 'j'])
+        self.assertEqual(self.tiered.cached_keys(['k', 'j']), set())
+        self.assertEqual(len(self.tiered.local), 0)
+
+
+class PostDetailCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.local.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x', role='author',
+        )
+        self.post = BlogPost.objects.create(
+            author=self.author, title='Cached', content='Body', status='published', published_at=timezone.now(),
+        )
+        self.url = f'/api/blog/posts/{self.post.slug}/'
+
+    def cached_author(self):
+        post_detail_cache.local.clear()
+        return post_detail_cache.get(self.post.slug)['author']
+
+    def test_profile_change_through_djoser_refreshes_cached_posts(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch('/api/auth/users/me/', {'username': 'renamed'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.cached_author()['username'], 'renamed')
+
+    def test_profile_change_through_model_save_refreshes_cached_posts(self):
+        self.client.get(self.url)
+        self.author.username = 'renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.cached_author()['username'], 'renamed')
+
+    def test_login_timestamp_does_not_refresh(self):
+        self.client.get(self.url)
+        with mock.patch('blog.object_cache.refresh_author_posts') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.author.save(update_fields=['last_login'])
+        refresh.assert_not_called()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PostDetailCacheFillTests(TransactionTestCase):
+    """`replica` never receives the primary's rows, see test_settings"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.local.clear()
+
+    def test_miss_is_filled_from_the_primary(self):
+        author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        post = BlogPost.objects.create(
+            author=author, title='Fresh', content='Body', status='published', published_at=timezone.now(),
+        )
+        response = self.client.get(f'/api/blog/posts/{post.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(post_detail_cache.get(post.slug)['id'], post.pk)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', work))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, ['value'] * 5)
+
+    def test_error_reaches_every_caller(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('k', mock.Mock(side_effect=ValueError))
+        # The failed call is not remembered
+        self.assertEqual(flight.do('k', lambda: 1), 1)
+
+
+@override_settings(SINGLEFLIGHT_LOCK_TIMEOUT=0.05)
+class CachedLoadTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_leader_stores_value_and_releases_its_lock(self):
+        self.assertEqual(singleflight._load('k', lambda: 1, 60), 1)
+        self.assertEqual(cache.get('k'), 1)
+        self.assertIsNone(cache.get('k:lock'))
+
+    def test_follower_reads_the_leaders_value(self):
+        cache.add('k:lock', 1, 60)
+        threading.Timer(0.01, lambda: cache.set('k', 'leader')).start()
+        loader = mock.Mock(return_value='follower')
+        self.assertEqual(singleflight._load('k', loader, 60), 'leader')
+        loader.assert_not_called()
+
+    def test_follower_that_times_out_leaves_the_lock_alone(self):
+        cache.add('k:lock', 'other', 60)
+        self.assertEqual(singleflight._load('k', lambda: 'follower', 60), 'follower')
+        self.assertEqual(cache.get('k:lock'), 'other')
+
+    def test_cached_read_skips_loader_on_hit(self):
+        cache.set('k', 'hit')
+        loader = mock.Mock()
+        self.assertEqual(singleflight.cached_read('k', loader), 'hit')
+        loader.assert_not_called()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        store = throttling.LocalBucketStore()
+        capacity, rate = throttling.parse_rate('3/min')
+        self.assertEqual((capacity, rate), (3, 0.05))
+        self.assertEqual([store.consume('k', capacity, rate, 0)[0] for _ in range(4)], [True, True, True, False])
+        # One token back after 20 seconds
+        self.assertTrue(store.consume('k', capacity, rate, 20)[0])
+        self.assertFalse(store.consume('k', capacity, rate, 20)[0])
+        self.assertTrue(store.consume('other', capacity, rate, 20)[0])
+
+
+class PublicReadThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.local.clear()
+        throttling._store = None
+        self.addCleanup(setattr, throttling, '_store', None)
+        rates = override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {'public_read_anon': '3/min', 'public_read_user': '3/min'},
+        })
+        rates.enable()
+        self.addCleanup(rates.disable)
+        author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        post = BlogPost.objects.create(
+            author=author, title='Hot', content='Body', status='published', published_at=timezone.now(),
+        )
+        self.url = f'/api/blog/posts/{post.slug}/'
+
+    def test_anonymous_clients_are_held_to_the_rate(self):
+        codes = [self.client.get(self.url).status_code for _ in range(4)]
+        self.assertEqual(codes, [200, 200, 200, 429])
+
+    def test_forged_forwarded_for_does_not_reset_the_bucket(self):
+        codes = [
+            self.client.get(self.url, HTTP_X_FORWARDED_FOR=f'10.0.0.{number}').status_code
+            for number in range(5)
+        ]
+        self.assertEqual(codes, [200, 200, 200, 429, 429])
+
+
+@override_settings(CONTENT_INLINE_RENDER_LIMIT=100000, RELATED_POSTS_COUNT=2)
+class RefreshRelatedTests(TestCase):
+    def setUp(self):
+        self.addCleanup(related.set_index, None)
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x')
+        texts = {
+            'owner': 'alpha beta gamma delta',
+            'first': 'alpha beta gamma',
+            'second': 'alpha beta delta',
+            'third': 'beta gamma delta',
+            'fourth': 'alpha gamma delta',
+        }
+        self.posts = {
+            title: BlogPost.objects.create(
+                author=self.author, title=title, content=text, tags='python',
+                status='published', published_at=timezone.now(),
+            )
+            for title, text in texts.items()
+        }
+        call_command('rebuild_related_posts', stdout=io.StringIO())
+
+    def related_ids(self, title):
+        return list(RelatedPost.objects.filter(post=self.posts[title]).values_list('related_id', flat=True))
+
+    def test_edited_post_leaving_a_list_is_replaced(self):
+        before = self.related_ids('owner')
+        self.assertEqual(len(before), 2)
+        leaving = BlogPost.objects.get(pk=before[0])
+        leaving.content, leaving.tags = 'something else entirely', ''
+        leaving.save()
+        related.refresh_post(leaving.pk)
+
+        after = self.related_ids('owner')
+        self.assertEqual(len(after), 2)
+        self.assertNotIn(leaving.pk, after)
+
+    def test_withdrawn_post_is_replaced(self):
+        leaving = BlogPost.objects.get(pk=self.related_ids('owner')[0])
+        leaving.status = 'draft'
+        leaving.save()
+        related.refresh_post(leaving.pk)
+
+        after = self.related_ids('owner')
+        self.assertEqual(len(after), 2)
+        self.assertNotIn(leaving.pk, after)
+        self.assertFalse(RelatedPost.objects.filter(related_id=leaving.pk).exists())
+
+
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.local.clear()
+        analytics.drain()
+        analytics._unwritten = None
+        self.addCleanup(setattr, analytics, '_unwritten', None)
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x', role='author')
+        self.post = BlogPost.objects.create(
+            author=self.author, title='Viewed', content='Body', tags='Python, web',
+            status='published', published_at=timezone.now(),
+        )
+        self.hour = int(time.time()) // analytics.HOUR
+
+    def view(self, count=1, post=None):
+        post = post or self.post
+        for _ in range(count):
+            analytics.record(post.pk, post.author_id, post.tag_list)
+
+    def test_aggregate_counts_every_bucket(self):
+        hour = 500000
+        events = [(1, 10, ('Python', 'web'), hour)] * 2 + [(2, 10, (), hour + 1)]
+        posts, authors, tags, totals = analytics.aggregate(events)
+        day = hour * analytics.HOUR // analytics.DAY * analytics.DAY
+        self.assertEqual(posts[(1, 10, 'hour', hour * analytics.HOUR)], 2)
+        self.assertEqual(posts[(1, 10, 'day', day)], 2)
+        self.assertEqual(authors[(10, 'hour', (hour + 1) * analytics.HOUR)], 1)
+        self.assertEqual(authors[(10, 'day', day)], 3)
+        self.assertEqual(tags[('python', 'hour', hour * analytics.HOUR)], 2)
+        self.assertEqual(totals, {1: 2, 2: 1})
+
+    def test_merge_keeps_one_row_per_post_bucket(self):
+        older = analytics.aggregate([(1, 10, (), 500000)])
+        newer = analytics.aggregate([(1, 11, (), 500000)])
+        posts, authors, _, totals = analytics.merge(older, newer)
+        self.assertEqual(posts[(1, 11, 'hour', 500000 * analytics.HOUR)], 2)
+        self.assertEqual(len(posts), 2)
+        self.assertEqual(totals[1], 2)
+        self.assertEqual(authors[(10, 'hour', 500000 * analytics.HOUR)], 1)
+
+    def test_flushes_add_up_in_the_rollups(self):
+        self.view(3)
+        self.assertEqual(analytics.flush(), 3)
+        self.view(2)
+        self.assertEqual(analytics.flush(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 5)
+        rollup = PostViewRollup.objects.get(post_id=self.post.pk, period='hour')
+        self.assertEqual(rollup.views, 5)
+        self.assertEqual(AuthorViewRollup.objects.get(author_id=self.author.pk, period='day').views, 5)
+        self.assertEqual(
+            dict(TagViewRollup.objects.filter(period='day').values_list('tag', 'views')), {'python': 5, 'web': 5},
+        )
+
+    def test_cached_detail_shows_flushed_views(self):
+        url = f'/api/blog/posts/{self.post.slug}/'
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        analytics.flush()
+        self.assertEqual(self.client.get(url).json()['views_count'], 3)
+
+    def test_failed_flush_is_retried(self):
+        self.view(3)
+        with mock.patch.object(analytics, 'write', side_effect=DatabaseError), self.assertLogs('blog.analytics'):
+            self.assertEqual(analytics.flush(), 0)
+        self.assertEqual(analytics.stats()['unwritten'], 3)
+        self.view(1)
+        self.assertEqual(analytics.flush(), 4)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 4)
+
+    @override_settings(ANALYTICS_FLUSH_ATTEMPTS=2)
+    def test_counts_are_dropped_after_the_last_attempt(self):
+        self.view(3)
+        lost = metrics.get('analytics.lost')
+        with mock.patch.object(analytics, 'write', side_effect=DatabaseError), self.assertLogs('blog.analytics'):
+            analytics.flush()
+            analytics.flush()
+        self.assertEqual(metrics.get('analytics.lost') - lost, 3)
+        self.assertIsNone(analytics._unwritten)
+        self.assertEqual(analytics.flush(), 0)
+
+    def test_author_report(self):
+        other = BlogPost.objects.create(
+            author=self.author, title='Other', content='Body', status='published', published_at=timezone.now(),
+        )
+        self.view(2)
+        self.view(5, other)
+        analytics.flush()
+        report = analytics.author_report(self.author.pk, 'hour', 3)
+        self.assertEqual(len(report['series']), 3)
+        self.assertEqual(report['series'][-1]['views'], 7)
+        self.assertEqual(report['total_views'], 7)
+        self.assertEqual(
+            [(row['post_id'], row['views']) for row in report['top_posts']], [(other.pk, 5), (self.post.pk, 2)],
+        )
+
+    def test_author_analytics_endpoint(self):
+        url = f'/api/blog/analytics/authors/{self.author.pk}/'
+        client = APIClient()
+        self.assertEqual(client.get(url).status_code, 401)
+
+        reader = User.objects.create_user(username='reader', email='reader@example.com', password='x')
+        client.force_authenticate(reader)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        client.force_authenticate(self.author)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['series']), 30)
+        self.assertEqual(len(client.get(url, {'period': 'hour'}).json()['series']), 48)
+        for params in ({'period': 'week'}, {'buckets': 0}, {'buckets': 1001}, {'buckets': 'abc'}):
+            self.assertEqual(client.get(url, params).status_code, 400, params)
+
+        admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', role='admin')
+        client.force_authenticate(admin)
+        self.assertEqual(client.get(url, {'buckets': 1}).status_code, 200)
+
+
+class CompiledPostListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com', password='x', role='author', bio='Writes',
+        )
+        self.published = BlogPost.objects.create(
+            author=self.author, title='Published', content='One two three', tags='python, web',
+            status='published', published_at=timezone.now(), featured_image='https://example.com/a.png',
+        )
+        self.draft = BlogPost.objects.create(author=self.author, title='Draft', content='Draft body')
+
+    def assertSameJSON(self):
+        queryset = BlogPost.objects.order_by('pk')
+        self.assertEqual(
+            JSONRenderer().render(compiled_post_list.data(queryset)),
+            JSONRenderer().render(BlogPostListSerializer(queryset, many=True).data),
+        )
+
+    def test_matches_list_serializer(self):
+        self.assertIsNone(self.draft.published_at)
+        self.assertSameJSON()
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_matches_list_serializer_outside_utc(self):
+        self.assertSameJSON()
+
+    def test_list_endpoint(self):
+        response = self.client.get('/api/blog/posts/', {'author': self.author.pk, 'search': 'Published'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(
+            response.json()['results'],
+            json.loads(JSONRenderer().render(BlogPostListSerializer([self.published], many=True).data)),
+        )
+
+    def test_author_sees_drafts(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.get('/api/blog/posts/', {'status': 'draft'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post['slug'] for post in response.json()['results']], [self.draft.slug])
@@ -0,0 +1,129 @@
+"""
+Token-bucket throttles for public read endpoints.
+
+Buckets live in Redis and are updated by a Lua script, so the refill and
+the take happen atomically even with many workers hitting the same key.
+Set THROTTLE_STORE = 'local' to keep buckets in process memory instead
+(tests, single-process development).
+"""
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TOKEN_BUCKET_LUA)
+
+    def consume(self, key, capacity, rate, now):
+        allowed, tokens = self.script(keys=[key], args=[capacity, rate, now])
+        return bool(allowed), float(tokens)
+
+
+class LocalBucketStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def consume(self, key, capacity, rate, now):
+        with self.lock:
+            tokens, ts = self.buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[key] = (tokens, now)
+        return allowed, tokens
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.THROTTLE_STORE == 'local':
+                    _store = LocalBucketStore()
+                else:
+                    _store = RedisBucketStore(settings.REDIS_URL)
+    return _store
+
+
+def parse_rate(rate):
+    """'120/min' -> (capacity 120, refill of 2 tokens per second)"""
+    num, period = rate.split('/')
+    capacity = int(num)
+    seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+    return capacity, capacity / seconds
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle safe requests per user (when authenticated) or per client IP.
+
+    Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under
+    '<scope>_user' and '<scope>_anon'; the capacity of the bucket is the
+    burst a client may spend before being held to the refill rate.
+    """
+    scope = None
+    timer = time.time
+
+    def allow_request(self, request, view):
+        if request.method not in permissions.SAFE_METHODS:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            kind, ident = 'user', request.user.pk
+        else:
+            kind, ident = 'anon', self.get_ident(request)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{self.scope}_{kind}')
+        if rate is None:
+            return True
+
+        capacity, refill = parse_rate(rate)
+        key = f'throttle:{self.scope}:{kind}:{ident}'
+        allowed, tokens = get_bucket_store().consume(key, capacity, refill, self.timer())
+        if not allowed:
+            metrics.incr(f'throttle.{self.scope}.{kind}.rejected')
+            self.wait_seconds = (1 - tokens) / refill
+        return allowed
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class PublicReadThrottle(TokenBucketThrottle):
+    scope = 'public_read'
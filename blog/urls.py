@@ -4,7 +4,11 @@ from . import views
 urlpatterns = [
     path('posts/', views.BlogPostListCreateView.as_view(), name='post-list-create'),
     path('posts/<slug:slug>/', views.BlogPostDetailView.as_view(), name='post-detail'),
+    path('posts/<slug:slug>/related/', views.related_posts, name='post-related'),
     path('posts/<int:post_id>/publish/', views.publish_post, name='publish-post'),
     path('my-posts/', views.my_posts, name='my-posts'),
+    path('analytics/authors/<int:author_id>/', views.author_analytics, name='author-analytics'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('feeds/<path:path>', views.feed_file, name='feed-file'),
     
 ]
@@ -1,21 +1,30 @@
 from rest_framework import generics, permissions, status, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
 from django.db.models import Q
-from .models import BlogPost
-from .serializers import BlogPostSerializer, BlogPostListSerializer
-from .permissions import IsAuthorOrReadOnly, IsOwnerOrReadOnly
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.views.decorators.http import condition, require_safe
+import os
+from . import analytics, archive, metrics, tasks
+from .models import BlogPost, RelatedPost
+from .object_cache import cache_post_detail, forget_post_detail, post_detail_cache, with_view_count
+from .serializers import BlogPostSerializer, BlogPostListSerializer, compiled_post_list
+from .permissions import IsAdminRole, IsAuthorOrReadOnly, IsOwnerOrReadOnly
+from .singleflight import cache_key, cached_read
+from .throttling import PublicReadThrottle
 
 class BlogPostListCreateView(generics.ListCreateAPIView):
     queryset = BlogPost.objects.filter(status='published')
     permission_classes = [IsAuthorOrReadOnly]
+    throttle_classes = [PublicReadThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'author', 'status']
-    search_fields = ['title', 'content', 'tags']
+    filterset_fields = ['author', 'status']
+    search_fields = ['title', 'content_text', 'tags']
     ordering_fields = ['created_at', 'updated_at', 'views_count']
     ordering = ['-created_at']
     
@@ -30,52 +39,91 @@ class BlogPostListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(status='published')
         return queryset
     
+    def list_data(self):
+        # Same output as BlogPostListSerializer, built from values_list rows
+        rows = compiled_post_list.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled_post_list.serialize(page)).data
+        return compiled_post_list.serialize(rows)
+    
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated and request.user.is_author:
+            return Response(self.list_data())
+        # Everyone else sees the same published listing, so identical
+        # concurrent requests share one query
+        key = cache_key('posts:list', request.get_full_path())
+        return Response(cached_read(key, self.list_data))
+    
     def perform_create(self, serializer):
-        post = serializer.save(author=self.request.user)
-        if post.status == 'published':
-            post.published_at = timezone.now()
-            post.save()
-            
-            # Send real-time notification
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                'blog_updates',
-                {
-                    'type': 'post_created',
-                    'message': {
-                        'id': post.id,
-                        'title': post.title,
-                        'author': post.author.username,
-                        'created_at': post.created_at.isoformat()
-                    }
-                }
-            )
+        published = serializer.validated_data.get('status') == 'published'
+        # One INSERT; everything else is queued for the worker (blog.tasks)
+        post = serializer.save(
+            author=self.request.user,
+            published_at=timezone.now() if published else None,
+        )
+        if published:
+            tasks.post_changed(post, post.tag_list)
+            tasks.send_notification.enqueue('post_created', {
+                'id': post.id,
+                'title': post.title,
+                'author': self.request.user.username,
+                'created_at': post.created_at.isoformat()
+            })
+        cache_post_detail(post)
 
 class BlogPostDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = BlogPost.objects.all()
     serializer_class = BlogPostSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    throttle_classes = [PublicReadThrottle]
     lookup_field = 'slug'
     
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # Archived posts are read-only from the cold table
+            if self.request.method not in permissions.SAFE_METHODS:
+                raise
+            post = archive.find_archived(self.kwargs[self.lookup_field])
+            if post is None:
+                raise
+            return post
+    
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.views_count += 1
-        instance.save(update_fields=['views_count'])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        # Payload is kept current by write-through on every change; views_count
+        # is overlaid from what the last analytics flush wrote
+        data = with_view_count(post_detail_cache.get_or_load(
+            kwargs[self.lookup_field],
+            lambda: dict(self.get_serializer(self.get_object()).data)
+        ))
+        # Buffered in process; views_count and the rollups are updated in bulk
+        analytics.record(data['id'], data['author']['id'], data['tag_list'])
+        return Response(data)
     
     def perform_update(self, serializer):
-        post = serializer.save()
-        if post.status == 'published' and not post.published_at:
-            post.published_at = timezone.now()
-            post.save()
+        instance = serializer.instance
+        previous_tags = instance.tag_list
+        extra = {}
+        if serializer.validated_data.get('status', instance.status) == 'published' and not instance.published_at:
+            extra['published_at'] = timezone.now()
+        post = serializer.save(**extra)
+        # Also drops the post from related lists and feeds when it is unpublished
+        tasks.post_changed(post, previous_tags + post.tag_list)
+        cache_post_detail(post)
+    
+    def perform_destroy(self, instance):
+        slug, post_id, author_id, tags = instance.slug, instance.pk, instance.author_id, instance.tag_list
+        instance.delete()
+        forget_post_detail(slug)
+        tasks.post_deleted(post_id, author_id, tags)
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def my_posts(request):
     posts = BlogPost.objects.filter(author=request.user)
-    serializer = BlogPostListSerializer(posts, many=True)
-    return Response(serializer.data)
+    return Response(compiled_post_list.data(posts))
 
 
 @api_view(['POST'])
@@ -86,24 +134,17 @@ def publish_post(request, post_id):
         if post.status == 'draft':
             post.status = 'published'
             post.published_at = timezone.now()
-            post.save()
-            
-            # Send real-time notification
-            channel_layer = get_channel_layer()
-            async_to_sync(channel_layer.group_send)(
-                'blog_updates',
-                {
-                    'type': 'post_published',
-                    'message': {
-                        'id': post.id,
-                        'title': post.title,
-                        'author': post.author.username,
-                        'published_at': post.published_at.isoformat()
-                    }
-                }
-            )
+            post.save(update_fields=['status', 'published_at', 'updated_at'])
+            tasks.post_changed(post, post.tag_list)
+            tasks.send_notification.enqueue('post_published', {
+                'id': post.id,
+                'title': post.title,
+                'author': request.user.username,
+                'published_at': post.published_at.isoformat()
+            })
             
             serializer = BlogPostSerializer(post)
+            cache_post_detail(post, serializer.data)
             return Response(serializer.data)
         else:
             return Response({'error': 'Post is not a draft'}, status=status.HTTP_400_BAD_REQUEST)
@@ -111,23 +152,117 @@ def publish_post(request, post_id):
         return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['GET'])
+@throttle_classes([PublicReadThrottle])
 def posts_by_author(request, author_id):
     from django.contrib.auth import get_user_model
     User = get_user_model()
     
-    try:
+    def load():
         author = User.objects.get(id=author_id)
         posts = BlogPost.objects.filter(author=author, status='published').order_by('-created_at')
-        serializer = BlogPostListSerializer(posts, many=True)
-        return Response({
+        return {
             'author': {
                 'id': author.id,
                 'username': author.username,
                 'email': author.email,
                 'bio': author.bio
             },
-            'posts': serializer.data
-        })
+            'posts': compiled_post_list.data(posts)
+        }
+    
+    try:
+        return Response(cached_read(cache_key('posts:by-author', author_id), load))
     except User.DoesNotExist:
         return Response({'error': 'Author not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([PublicReadThrottle])
+def related_posts(request, slug):
+    """Precomputed related posts, best match first"""
+    def load():
+        entries = (
+            RelatedPost.objects.filter(post__slug=slug, related__status='published')
+            .select_related('related__author')
+            .order_by('rank')
+        )
+        posts = [entry.related for entry in entries]
+        if not posts and not BlogPost.objects.filter(slug=slug).exists():
+            return None
+        return {
+            'post': slug,
+            'results': BlogPostListSerializer(posts, many=True).data
+        }
+    
+    data = cached_read(cache_key('posts:related', slug), load)
+    if data is None:
+        return Response({'error': 'Post not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
+
+def _feed_variant(request, path):
+    """Resolve a feed path to (file, gzip?) or None; prefers the precompressed copy."""
+    try:
+        full_path = safe_join(settings.FEEDS_ROOT, path)
+    except SuspiciousFileOperation:
+        return None
+    if not path.endswith('.xml') or not os.path.isfile(full_path):
+        return None
+    if 'gzip' in request.headers.get('Accept-Encoding', '') and os.path.isfile(full_path + '.gz'):
+        return full_path + '.gz', True
+    return full_path, False
+
+def _feed_etag(request, path):
+    variant = _feed_variant(request, path)
+    if variant is None:
+        return None
+    stat = os.stat(variant[0])
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+@require_safe
+@condition(etag_func=_feed_etag)
+def feed_file(request, path):
+    """Serve a pre-built sitemap or RSS/Atom file, see blog.feeds"""
+    variant = _feed_variant(request, path)
+    if variant is None:
+        raise Http404('Feed not found')
+    file_path, compressed = variant
+    content_type = 'application/atom+xml' if path.endswith('atom.xml') else (
+        'application/rss+xml' if path.endswith('rss.xml') else 'application/xml'
+    )
+    # Named after the requested file, not the .gz copy it may be served from
+    response = FileResponse(
+        open(file_path, 'rb'), content_type=f'{content_type}; charset=utf-8', filename=os.path.basename(path),
+    )
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={settings.FEEDS_MAX_AGE}'
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def author_analytics(request, author_id):
+    """Views of an author's posts per hour or day, read from the rollup tables only"""
+    if request.user.pk != author_id and not request.user.is_admin:
+        return Response({'error': 'You can only view your own analytics'}, status=status.HTTP_403_FORBIDDEN)
+    period = request.query_params.get('period', 'day')
+    if period not in analytics.PERIOD_SECONDS:
+        return Response({'error': "period must be 'hour' or 'day'"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        buckets = int(request.query_params.get('buckets', 48 if period == 'hour' else 30))
+    except ValueError:
+        buckets = 0
+    if not 1 <= buckets <= 1000:
+        return Response({'error': 'buckets must be between 1 and 1000'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(analytics.author_report(author_id, period, buckets))
+
+@api_view(['GET'])
+@permission_classes([IsAdminRole])
+def metrics_view(request):
+    """Throttle, request-coalescing and object cache counters for the serving process"""
+    return Response({
+        **metrics.snapshot(),
+        'object_caches': {'post_detail': post_detail_cache.stats()},
+        'analytics': analytics.stats(),
+    })
+
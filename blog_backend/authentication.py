@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .db_router import primary_reads
+
+
+class PrimaryJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user from the primary, so a token issued
+    right after signing up works before the account reaches the replicas.
+    """
+
+    def get_user(self, validated_token):
+        with primary_reads():
+            return super().get_user(validated_token)
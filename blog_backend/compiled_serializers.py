@@ -0,0 +1,160 @@
+"""
+Read-only "compiled" mode for list serializers.
+
+A DRF ModelSerializer builds a model instance per row and then walks every
+field object of every row through `to_representation`. `CompiledSerializer`
+inspects a serializer class once, works out which database columns its
+fields read, and afterwards serializes plain `values_list` tuples with a
+precomputed getter per field. The output is the same as the serializer it
+was compiled from: same keys in the same order, same values, so the JSON
+renders byte for byte identically.
+
+Fields that do not map to a column (properties, SerializerMethodFields) are
+declared in ``computed`` as ``name: (source columns, function)``; the
+function receives the column values positionally.
+"""
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.settings import api_settings
+
+# Database values of these fields are already what `to_representation` returns
+PASSTHROUGH_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.ChoiceField,
+    fields.IntegerField,
+    fields.ReadOnlyField,
+)
+UNSUPPORTED_FIELDS = (
+    fields.FileField,
+    fields.SerializerMethodField,
+    relations.RelatedField,
+    relations.ManyRelatedField,
+    serializers.ListSerializer,
+)
+
+
+# Each field compiles to a factory that takes the active time zone (looked up
+# once per `serialize` call, not once per value) and returns a row getter.
+
+def _column(index, convert):
+    def bind(tz):
+        if convert is None:
+            return itemgetter(index)
+
+        def getter(row):
+            value = row[index]
+            return None if value is None else convert(value)
+        return getter
+    return bind
+
+
+def _datetime_column(index, field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != ISO_8601:
+        return _column(index, field.to_representation)
+
+    def bind(tz):
+        tz = getattr(field, 'timezone', tz)
+        if tz is None:
+            return _column(index, field.to_representation)(tz)
+
+        def getter(row):
+            value = row[index]
+            if value is None:
+                return None
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            text = value.astimezone(tz).isoformat()
+            return text[:-6] + 'Z' if text.endswith('+00:00') else text
+        return getter
+    return bind
+
+
+def _computed(indexes, function):
+    def bind(tz):
+        if len(indexes) == 1:
+            index = indexes[0]
+            return lambda row: function(row[index])
+        return lambda row: function(*(row[index] for index in indexes))
+    return bind
+
+
+def _nested(null_index, steps):
+    def bind(tz):
+        bound = _bind(steps, tz)
+
+        def getter(row):
+            if row[null_index] is None:
+                return None
+            return {name: get(row) for name, get in bound}
+        return getter
+    return bind
+
+
+def _bind(steps, tz):
+    return [(name, factory(tz)) for name, factory in steps]
+
+
+class CompiledSerializer:
+    def __init__(self, serializer_class, computed=None):
+        self.serializer_class = serializer_class
+        self.columns = []
+        self.steps = self._compile(serializer_class(), '', computed or {})
+
+    def _column_index(self, path):
+        if path not in self.columns:
+            self.columns.append(path)
+        return self.columns.index(path)
+
+    def _compile(self, serializer, prefix, computed):
+        model = serializer.Meta.model
+        steps = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            name = field.field_name
+            if name in computed:
+                sources, function = computed[name]
+                indexes = [self._column_index(prefix + source) for source in sources]
+                steps.append((name, _computed(indexes, function)))
+                continue
+            if isinstance(field, serializers.Serializer):
+                nested = self._compile(field, f'{prefix}{field.source}__', {})
+                steps.append((name, _nested(self._column_index(prefix + field.source), nested)))
+                continue
+            if isinstance(field, UNSUPPORTED_FIELDS) or len(field.source_attrs) != 1:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name} cannot be compiled; declare it in computed'
+                )
+            try:
+                model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name} is not a column of {model.__name__}; '
+                    f'declare it in computed'
+                )
+            index = self._column_index(prefix + field.source)
+            if isinstance(field, fields.DateTimeField):
+                steps.append((name, _datetime_column(index, field)))
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                steps.append((name, _column(index, None)))
+            else:
+                steps.append((name, _column(index, field.to_representation)))
+        return steps
+
+    def rows(self, queryset):
+        """``queryset`` as tuples of exactly the columns the fields need"""
+        return queryset.values_list(*self.columns)
+
+    def serialize(self, rows):
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        steps = _bind(self.steps, tz)
+        return [{name: get(row) for name, get in steps} for row in rows]
+
+    def data(self, queryset):
+        return self.serialize(self.rows(queryset))
@@ -0,0 +1,144 @@
+"""
+Primary/replica database routing with read-your-writes consistency.
+
+Reads for the blog and users apps go to a replica and writes go to the
+primary. Two things keep a client from reading stale data it just wrote:
+
+* unsafe requests (POST/PUT/PATCH/DELETE) read from the primary throughout,
+  so e.g. logging in right after signing up finds the new account, and so
+  does anything inside a transaction on the primary;
+* after a successful unsafe request the client is pinned to the primary for
+  READ_YOUR_WRITES_SECONDS, so the next few requests see their own changes
+  even if the replica is lagging. The pin is a short-lived cookie, which
+  also covers anonymous clients, plus a cache entry per authenticated user
+  for clients that do not keep cookies.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'db_pin_primary'
+
+_routing_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def pin_key(user_id):
+    return f'db:pin-primary:{user_id}'
+
+
+def _resolved_user(request):
+    # Never force a lazy session user from inside the router: doing so would
+    # run a query, which would ask the router again.
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def _cookie_pinned(request):
+    # The cookie holds the epoch second its pin runs out
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self.pinned = None
+        if request is not None and (request.method not in SAFE_METHODS or _cookie_pinned(request)):
+            self.pinned = True
+
+    def use_primary(self):
+        if self.wrote:
+            return True
+        if self.pinned is None:
+            user = _resolved_user(self.request)
+            if user is None:
+                # Decide again once authentication has identified the user
+                return False
+            self.pinned = cache.get(pin_key(user.pk)) is not None
+        return self.pinned
+
+
+@contextmanager
+def primary_reads():
+    """Send every read in the block to the primary (background jobs acting on fresh writes)."""
+    state = RoutingState(None)
+    state.pinned = True
+    token = _routing_state.set(state)
+    try:
+        yield
+    finally:
+        _routing_state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    route_app_labels = {'blog', 'users'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels or not settings.DATABASE_REPLICAS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups follow the database the instance came from
+            return instance._state.db
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        state = _routing_state.get()
+        if state is not None and state.use_primary():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Track writes per request and pin writers to the primary afterwards."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(request)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = settings.READ_YOUR_WRITES_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + seconds)), max_age=seconds,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+            user = _resolved_user(request)
+            if user is not None:
+                cache.set(pin_key(user.pk), 1, seconds)
+        return response
@@ -1,5 +1,5 @@
 import os
-from decouple import config
+from decouple import config, Csv
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'djoser',
     'blog',
     'users',
+    'taskqueue',
 ]
 
 MIDDLEWARE = [
@@ -32,6 +33,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog_backend.db_router.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,9 +66,30 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default='1234'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # Keep connections open between requests instead of reconnecting each time
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1:5432,replica2:5432
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+    host, _, port = replica.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['blog_backend.db_router.PrimaryReplicaRouter']
+
+# After a write, the user's reads stay on the primary for this many seconds
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=5, cast=int)
+
 # Redis Configuration
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379')
 
@@ -80,6 +103,27 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache (shared between workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+# Anonymous read responses are cached this long (seconds); concurrent misses
+# for the same key are collapsed into a single query
+READ_CACHE_TIMEOUT = config('READ_CACHE_TIMEOUT', default=5, cast=int)
+SINGLEFLIGHT_LOCK_TIMEOUT = config('SINGLEFLIGHT_LOCK_TIMEOUT', default=5, cast=int)
+
+# Post detail object cache: per-process LRU in front of the shared cache
+POST_CACHE_LOCAL_SIZE = config('POST_CACHE_LOCAL_SIZE', default=1000, cast=int)
+POST_CACHE_LOCAL_TTL = config('POST_CACHE_LOCAL_TTL', default=10, cast=int)
+POST_CACHE_SHARED_TTL = config('POST_CACHE_SHARED_TTL', default=300, cast=int)
+
+# Token-bucket throttle storage: 'redis' (shared, atomic) or 'local' (in-process)
+THROTTLE_STORE = config('THROTTLE_STORE', default='redis')
+
 AUTH_USER_MODEL = 'users.User'
 
 # Redis Configuration (for local Redis)
@@ -98,13 +142,21 @@ CHANNEL_LAYERS = {
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'blog_backend.authentication.PrimaryJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_THROTTLE_RATES': {
+        'public_read_anon': config('PUBLIC_READ_RATE_ANON', default='120/min'),
+        'public_read_user': config('PUBLIC_READ_RATE_USER', default='600/min'),
+    },
+    # Reverse proxies in front of the app. Anonymous throttles key on the
+    # client address; with 0 that is REMOTE_ADDR and a client-sent
+    # X-Forwarded-For is ignored. Behind one proxy, set 1.
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # JWT Settings
@@ -133,6 +185,36 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Content pipeline: posts larger than this (in characters) are rendered by
+# the blog.tasks.render_post background task instead of inside the save.
+# Until then their rendered HTML, text and generated excerpt are empty.
+# 0 keeps all rendering out of the request.
+CONTENT_INLINE_RENDER_LIMIT = config('CONTENT_INLINE_RENDER_LIMIT', default=0, cast=int)
+
+# Background task queue, see taskqueue.queue and `manage.py run_worker`
+TASK_WORKER_PROCESSES = config('TASK_WORKER_PROCESSES', default=2, cast=int)
+TASK_POLL_INTERVAL = config('TASK_POLL_INTERVAL', default=1.0, cast=float)
+# A running task not finished within its lease is handed to another worker
+TASK_LEASE_SECONDS = config('TASK_LEASE_SECONDS', default=300, cast=int)
+TASK_RETENTION_HOURS = config('TASK_RETENTION_HOURS', default=24, cast=int)
+
+# Number of precomputed related posts kept per post
+RELATED_POSTS_COUNT = config('RELATED_POSTS_COUNT', default=5, cast=int)
+
+# Static sitemap and RSS/Atom feeds, see blog.feeds
+SITE_URL = config('SITE_URL', default='http://localhost:8000')
+FEEDS_ROOT = config('FEEDS_ROOT', default=os.path.join(BASE_DIR, 'feeds'))
+FEEDS_MAX_AGE = config('FEEDS_MAX_AGE', default=300, cast=int)
+
+# View analytics, see blog.analytics: events kept per process before a flush
+ANALYTICS_BUFFER_SIZE = config('ANALYTICS_BUFFER_SIZE', default=200000, cast=int)
+ANALYTICS_FLUSH_INTERVAL = config('ANALYTICS_FLUSH_INTERVAL', default=5.0, cast=float)
+ANALYTICS_FLUSH_SIZE = config('ANALYTICS_FLUSH_SIZE', default=20000, cast=int)
+# Rows per multi-row upsert statement
+ANALYTICS_FLUSH_BATCH = config('ANALYTICS_FLUSH_BATCH', default=1000, cast=int)
+# Flushes a batch of counts may fail (being retried with the next one) before it is dropped
+ANALYTICS_FLUSH_ATTEMPTS = config('ANALYTICS_FLUSH_ATTEMPTS', default=5, cast=int)
+
 # Djoser settings
 DJOSER = {
     'SERIALIZERS': {
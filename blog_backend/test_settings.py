@@ -0,0 +1,46 @@
+"""
+Settings for running the test suite without PostgreSQL or Redis:
+
+    python manage.py test blog.tests users.tests taskqueue.tests blog_backend.tests --settings=blog_backend.test_settings
+
+Name the test modules: the apps are namespace packages, which test
+discovery does not descend into.
+
+`replica` is a second SQLite database that is deliberately *not* a test
+mirror of `default`, so nothing written to the primary ever shows up there.
+It behaves like a replica that is lagging indefinitely, which makes
+read-your-writes routing observable: a read that should have been pinned to
+the primary but went to the replica will not find the row. Tests touching
+both databases need `databases = {'default', 'replica'}`.
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+}
+DATABASE_REPLICAS = ['replica']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+THROTTLE_STORE = 'local'
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# Flush view events explicitly with blog.analytics.flush()
+ANALYTICS_FLUSH_INTERVAL = 0
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
@@ -0,0 +1,79 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from blog.models import BlogPost
+from users.models import User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadYourWritesTests(TransactionTestCase):
+    """`replica` never receives the primary's rows, see test_settings"""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+
+    def signup(self, client, username='reader'):
+        response = client.post('/api/auth/users/', {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'a-long-test-password',
+            're_password': 'a-long-test-password',
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_unpinned_read_goes_to_lagging_replica(self):
+        user = User.objects.create_user(username='writer', email='writer@example.com', password='x')
+        response = self.client.get(f'/api/users/{user.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_write_pins_client_to_primary(self):
+        user_id = self.signup(self.client)
+        response = self.client.get(f'/api/users/{user_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['username'], 'reader')
+
+    def test_other_client_is_not_pinned(self):
+        user_id = self.signup(self.client)
+        response = self.client_class().get(f'/api/users/{user_id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_login_right_after_signup(self):
+        self.signup(self.client)
+        # A fresh client without the pin cookie: unsafe requests read the primary anyway
+        response = self.client_class().post('/api/auth/jwt/create/', {
+            'email': 'reader@example.com', 'password': 'a-long-test-password',
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_authenticated_writer_pinned_without_cookie(self):
+        self.signup(self.client)
+        token = self.client.post('/api/auth/jwt/create/', {
+            'email': 'reader@example.com', 'password': 'a-long-test-password',
+        }).json()['access']
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.assertEqual(self.client.patch('/api/users/profile/', {'bio': 'hi'}, 'application/json', **headers).status_code, 200)
+
+        response = self.client_class().get('/api/users/profile/', **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bio'], 'hi')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class CommandReadsTests(TransactionTestCase):
+    """Management commands run outside any request and must not read the lagging replica"""
+    databases = {'default', 'replica'}
+
+    def test_render_content_finds_new_posts(self):
+        author = User.objects.create_user(username='writer', email='writer@example.com', password='x')
+        post = BlogPost.objects.create(author=author, title='Unrendered', content='Hello')
+        BlogPost.objects.filter(pk=post.pk).update(content_hash='')
+
+        out = io.StringIO()
+        call_command('render_content', stdout=out)
+        self.assertIn('Rendered 1 post(s)', out.getvalue())
+        self.assertNotEqual(BlogPost.objects.using('default').get(pk=post.pk).content_hash, '')
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from blog.api_docs import api_documentation
+from blog.views import feed_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,5 +10,6 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/blog/', include('blog.urls')),
     path('api/docs/', api_documentation, name='api-docs'),
+    path('sitemap.xml', feed_file, {'path': 'sitemap.xml'}, name='sitemap'),
     path('', api_documentation, name='api-docs-root'),
 ]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+View-event ingestion throughput of blog.analytics on one process.
+
+Records synthetic views spread over many posts, authors, tags and hours,
+then flushes them into the rollup tables, and reports events per second for
+recording alone, for the flush, and end to end. Everything runs inside a
+transaction that is rolled back, and the post ids lie beyond the existing
+ones, so the database is left as it was.
+
+    python scripts/benchmark_analytics.py
+    python scripts/benchmark_analytics.py --events 500000 --posts 20000 --flush-every 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_backend.settings')
+
+import django
+django.setup()
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from blog import analytics
+from blog.models import BlogPost
+
+TARGET = 10000
+TAGS = ['python', 'django', 'performance', 'databases', 'web', 'testing', 'devops', 'career']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--authors', type=int, default=200)
+    parser.add_argument('--hours', type=int, default=24, help='Spread the events over this many hours')
+    parser.add_argument('--flush-every', type=int, default=settings.ANALYTICS_FLUSH_SIZE)
+    args = parser.parse_args()
+
+    if not 0 < args.flush_every <= settings.ANALYTICS_BUFFER_SIZE:
+        parser.error(f'--flush-every must be between 1 and ANALYTICS_BUFFER_SIZE ({settings.ANALYTICS_BUFFER_SIZE})')
+    # Flush in this thread only, inside the transaction below
+    settings.ANALYTICS_FLUSH_INTERVAL = 0
+
+    rng = random.Random(42)
+    first_id = (BlogPost.objects.aggregate(top=Max('id'))['top'] or 0) + 1_000_000
+    posts = [
+        (first_id + i, rng.randrange(1, args.authors + 1), rng.sample(TAGS, rng.randint(0, 3)))
+        for i in range(args.posts)
+    ]
+    # Popular posts get most views, like real traffic
+    weights = [1 / (rank + 1) for rank in range(args.posts)]
+    start = time.time() - args.hours * analytics.HOUR
+    views = rng.choices(posts, weights=weights, k=args.events)
+    stamps = [start + rng.random() * args.hours * analytics.HOUR for _ in range(args.events)]
+
+    record_seconds = flush_seconds = 0.0
+    with transaction.atomic():
+        for offset in range(0, args.events, args.flush_every):
+            started = time.perf_counter()
+            for (post_id, author_id, tags), stamp in zip(
+                views[offset:offset + args.flush_every], stamps[offset:offset + args.flush_every]
+            ):
+                analytics.record(post_id, author_id, tags, now=stamp)
+            record_seconds += time.perf_counter() - started
+
+            started = time.perf_counter()
+            analytics.flush()
+            flush_seconds += time.perf_counter() - started
+        transaction.set_rollback(True)
+
+    total = record_seconds + flush_seconds
+    print(f"{args.events:,} events over {args.posts:,} posts, flushed every {args.flush_every:,}")
+    print(f"record:     {args.events / record_seconds:>12,.0f} events/s")
+    print(f"flush:      {args.events / flush_seconds:>12,.0f} events/s")
+    print(f"end to end: {args.events / total:>12,.0f} events/s "
+          f"({'meets' if args.events / total >= TARGET else 'below'} the {TARGET:,}/s target)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Rows per second of BlogPostListSerializer against its compiled mode.
+
+By default both paths serialize the same synthetic in-memory page (model
+instances for DRF, tuples for the compiled mode), which isolates the
+serialization cost. With --from-db each run reads the newest posts of the
+configured database instead, so the query and row construction are timed
+too. Every page size also checks that both paths render identical JSON.
+
+    python scripts/benchmark_serializers.py
+    python scripts/benchmark_serializers.py --sizes 10 100 --from-db
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_backend.settings')
+
+import django
+django.setup()
+
+from django.db.models import Model
+from rest_framework.renderers import JSONRenderer
+
+from blog.models import BlogPost
+from blog.serializers import BlogPostListSerializer, compiled_post_list
+from users.models import User
+
+WORDS = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor'.split()
+
+
+def synthetic_posts(count):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    authors = [
+        User(id=i, username=f'author{i}', email=f'author{i}@example.com', role='author',
+             bio='Writes about things.', avatar='', created_at=start)
+        for i in range(1, 21)
+    ]
+    posts = []
+    for i in range(1, count + 1):
+        author = authors[i % len(authors)]
+        posts.append(BlogPost(
+            id=i, title=f'Post number {i}', slug=f'post-number-{i}',
+            content=' '.join(WORDS[j % len(WORDS)] for j in range(i % 40 * 50 + 30)),
+            excerpt=f'Excerpt of post {i}', author=author, status='published',
+            featured_image='https://example.com/image.png' if i % 3 else '',
+            tags='python, django' if i % 2 else 'performance',
+            views_count=i * 7, created_at=start + timedelta(minutes=i),
+            published_at=start + timedelta(minutes=i, microseconds=i) if i % 5 else None,
+        ))
+    return posts
+
+
+def as_row(post):
+    row = []
+    for path in compiled_post_list.columns:
+        value = post
+        for attr in path.split('__'):
+            value = getattr(value, attr)
+        row.append(value.pk if isinstance(value, Model) else value)
+    return tuple(row)
+
+
+def best_rate(function, rows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per size; the best one counts')
+    parser.add_argument('--from-db', action='store_true', help='Read the newest posts from the database')
+    args = parser.parse_args()
+
+    render = JSONRenderer().render
+    print(f'{"page size":>10} {"drf rows/s":>14} {"compiled rows/s":>16} {"speedup":>8}')
+    for size in args.sizes:
+        if args.from_db:
+            queryset = BlogPost.objects.select_related('author').order_by('-created_at')[:size]
+            rows = queryset.count()
+            if not rows:
+                sys.exit('No posts in the database; run without --from-db')
+            drf = lambda: BlogPostListSerializer(queryset.all(), many=True).data
+            compiled = lambda: compiled_post_list.data(queryset.all())
+        else:
+            posts = synthetic_posts(size)
+            tuples = [as_row(post) for post in posts]
+            rows = size
+            drf = lambda: BlogPostListSerializer(posts, many=True).data
+            compiled = lambda: compiled_post_list.serialize(tuples)
+
+        if render(drf()) != render(compiled()):
+            sys.exit(f'Output differs at page size {size}')
+        drf_rate = best_rate(drf, rows, args.repeat)
+        compiled_rate = best_rate(compiled, rows, args.repeat)
+        print(f'{size:>10} {drf_rate:>14,.0f} {compiled_rate:>16,.0f} {compiled_rate / drf_rate:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+from django.contrib import admin, messages
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Task
+from .queue import queue_stats
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'priority', 'attempts', 'max_attempts', 'run_after', 'lag', 'dedupe_key']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedupe_key']
+    readonly_fields = [
+        'name', 'args', 'dedupe_key', 'attempts', 'locked_by', 'locked_until',
+        'last_error', 'created_at', 'started_at', 'finished_at',
+    ]
+    actions = ['retry_tasks']
+    
+    @admin.display(description='Lag')
+    def lag(self, obj):
+        """How long a ready task has been waiting for a worker"""
+        now = timezone.now()
+        if obj.status != Task.QUEUED or obj.run_after > now:
+            return '-'
+        return f'{(now - obj.run_after).total_seconds():.1f}s'
+    
+    @admin.action(description='Queue selected tasks again now')
+    def retry_tasks(self, request, queryset):
+        try:
+            with transaction.atomic():
+                updated = queryset.exclude(status=Task.QUEUED).update(
+                    status=Task.QUEUED, attempts=0, run_after=timezone.now(), locked_until=None,
+                )
+        except IntegrityError:
+            self.message_user(request, 'A task with the same dedupe key is already queued', messages.ERROR)
+            return
+        self.message_user(request, f'{updated} task(s) queued again')
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'queue_stats': queue_stats()}
+        return super().changelist_view(request, extra_context=extra_context)
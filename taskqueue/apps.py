@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+class TaskQueueConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taskqueue'
+    
+    def ready(self):
+        # Register the @task functions of every app (<app>/tasks.py)
+        autodiscover_modules('tasks')
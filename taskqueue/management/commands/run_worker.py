@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from taskqueue import queue
+
+
+def work(stop, options):
+    """Claim-and-run loop of one pool process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f'{socket.gethostname()[:60]}:{os.getpid()}'
+    while not stop.is_set():
+        close_old_connections()
+        row = queue.claim(worker_id)
+        if row is not None:
+            queue.run(row)
+        elif options['burst']:
+            return
+        else:
+            stop.wait(options['poll_interval'])
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks (post rendering, related posts, feeds, "
+        "notifications) in a pool of worker processes until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.TASK_WORKER_PROCESSES)
+        parser.add_argument('--poll-interval', type=float, default=settings.TASK_POLL_INTERVAL)
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue has no ready tasks instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        # Children are forked and must not share the parent's sockets
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        def start():
+            process = context.Process(target=work, args=(stop, options), daemon=True)
+            process.start()
+            return process
+
+        pool = [start() for _ in range(options['processes'])]
+        self.stdout.write(f"Started {len(pool)} worker process(es)")
+        last_prune = 0
+        try:
+            while not stop.is_set():
+                if options['burst'] and not any(process.is_alive() for process in pool):
+                    break
+                if not options['burst']:
+                    for number, process in enumerate(pool):
+                        if not process.is_alive():
+                            # A task crashed the interpreter; keep the pool at full size
+                            pool[number] = start()
+                if time.monotonic() - last_prune > 3600:
+                    pruned = queue.prune(settings.TASK_RETENTION_HOURS)
+                    connections.close_all()
+                    if pruned:
+                        self.stdout.write(f"Pruned {pruned} finished task(s)")
+                    last_prune = time.monotonic()
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        stop.set()
+        for process in pool:
+            process.join()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
@@ -0,0 +1,180 @@
+"""
+Database-backed task queue.
+
+Functions decorated with `@task` in an app's ``tasks.py`` are registered by
+dotted path. ``fn.enqueue(*args)`` (or `enqueue` with the path) inserts a
+Task row in the caller's transaction, so a job is only visible to workers
+once the write that caused it has committed. `manage.py run_worker` claims
+ready rows one at a time with ``SELECT ... FOR UPDATE SKIP LOCKED``, runs
+them with every read routed to the primary and retries failures with
+exponential backoff. Only the claim that currently holds a row's lease may
+record its outcome.
+
+A ``dedupe_key`` collapses repeated requests for the same work: while a task
+with that key is still queued, enqueueing another one is a no-op.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from blog_backend.db_router import primary_reads
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 3600
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, priority, max_attempts, retry_delay):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def enqueue(self, *args, dedupe_key='', priority=None, delay=0):
+        return enqueue(self.name, *args, dedupe_key=dedupe_key, priority=priority, delay=delay)
+
+
+def task(priority=0, max_attempts=5, retry_delay=10):
+    """Register a function as a task; its arguments must be JSON serializable."""
+    def register(func):
+        task_function = TaskFunction(func, priority, max_attempts, retry_delay)
+        _registry[task_function.name] = task_function
+        return task_function
+    return register
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(name, *args, dedupe_key='', priority=None, delay=0):
+    """Queue ``name(*args)``; a no-op while a task with ``dedupe_key`` is still queued."""
+    task_function = get_task(name)
+    row = Task(
+        name=name,
+        args=list(args),
+        dedupe_key=dedupe_key,
+        priority=task_function.priority if priority is None else priority,
+        max_attempts=task_function.max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    if dedupe_key:
+        # ON CONFLICT DO NOTHING against the partial unique index on queued keys
+        Task.objects.bulk_create([row], ignore_conflicts=True)
+    else:
+        row.save()
+
+
+def ready_filter(now):
+    # Running tasks whose lease ran out belong to a worker that died
+    return Q(status=Task.QUEUED, run_after__lte=now) | Q(status=Task.RUNNING, locked_until__lt=now)
+
+
+def claim(worker_id):
+    """
+    Take the next ready task, or None. One row at a time, so the lease starts
+    when the task does and a task queued by the one running now is claimed on
+    its own terms instead of sitting in a batch already marked running.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        while True:
+            row = (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(ready_filter(now))
+                .order_by('-priority', 'run_after', 'id')
+                .first()
+            )
+            if row is None:
+                return None
+            if row.status == Task.QUEUED or row.attempts < row.max_attempts:
+                break
+            # Every attempt lost its worker, e.g. the task itself kills the process
+            row.status = Task.FAILED
+            row.locked_until = None
+            row.finished_at = now
+            row.last_error = f'Worker lost on all {row.attempts} attempt(s) (lease expired)'
+            row.save(update_fields=['status', 'locked_until', 'finished_at', 'last_error'])
+            logger.error('Task %s (%s) failed: its lease expired on the last attempt', row.pk, row.name)
+        # Unique per claim, so a worker whose lease was taken over can tell
+        row.locked_by = f'{worker_id}/{uuid.uuid4().hex[:12]}'
+        row.locked_until = now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+        row.status = Task.RUNNING
+        row.started_at = now
+        row.attempts += 1
+        row.save(update_fields=['locked_by', 'locked_until', 'status', 'started_at', 'attempts'])
+    return row
+
+
+def _owned(row):
+    """The task row, as long as this claim still holds it"""
+    return Task.objects.filter(pk=row.pk, status=Task.RUNNING, locked_by=row.locked_by)
+
+
+def run(row):
+    """Run one claimed task and record the outcome."""
+    try:
+        with primary_reads():
+            get_task(row.name).func(*row.args)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Task %s (%s) failed on attempt %d', row.pk, row.name, row.attempts)
+        _failed(row, error)
+        return False
+    finished = _owned(row).update(
+        status=Task.DONE, locked_until=None, finished_at=timezone.now(), last_error=''
+    )
+    if not finished:
+        logger.warning('Task %s (%s) outlived its lease and was handed to another worker', row.pk, row.name)
+    return True
+
+
+def _failed(row, error):
+    now = timezone.now()
+    if row.attempts >= row.max_attempts or row.name not in _registry:
+        _owned(row).update(status=Task.FAILED, locked_until=None, finished_at=now, last_error=error)
+        return
+    delay = min(MAX_RETRY_DELAY, get_task(row.name).retry_delay * 2 ** (row.attempts - 1))
+    try:
+        with transaction.atomic():
+            _owned(row).update(
+                status=Task.QUEUED, locked_until=None, last_error=error,
+                run_after=now + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        # A duplicate was queued meanwhile and will redo the same work
+        _owned(row).delete()
+
+
+def prune(older_than_hours):
+    cutoff = timezone.now() - timedelta(hours=older_than_hours)
+    return Task.objects.filter(status=Task.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def queue_stats():
+    """Counts per status and the lag of the oldest task that is ready but not started."""
+    now = timezone.now()
+    counts = dict(Task.objects.values_list('status').annotate(count=Count('id')).order_by())
+    oldest_ready = Task.objects.filter(status=Task.QUEUED, run_after__lte=now).aggregate(
+        oldest=Min('run_after')
+    )['oldest']
+    return {
+        'counts': {status: counts.get(status, 0) for status, _ in Task.STATUS_CHOICES},
+        'lag_seconds': (now - oldest_ready).total_seconds() if oldest_ready else 0.0,
+    }
@@ -0,0 +1,169 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Task
+
+calls = []
+
+
+@queue.task(priority=1, max_attempts=3, retry_delay=10)
+def record(value):
+    calls.append(value)
+
+
+@queue.task(max_attempts=2, retry_delay=10)
+def explode():
+    raise RuntimeError('boom')
+
+
+RECORD = 'taskqueue.tests.record'
+
+
+class EnqueueTests(TestCase):
+    def test_dedupe_key_collapses_queued_duplicates(self):
+        record.enqueue(1, dedupe_key='same')
+        record.enqueue(2, dedupe_key='same')
+        record.enqueue(3)
+        record.enqueue(4)
+        self.assertEqual(Task.objects.filter(dedupe_key='same').count(), 1)
+        self.assertEqual(Task.objects.count(), 3)
+
+    def test_dedupe_key_only_applies_while_queued(self):
+        record.enqueue(1, dedupe_key='same')
+        row = queue.claim('worker')
+        record.enqueue(2, dedupe_key='same')
+        self.assertEqual(Task.objects.filter(dedupe_key='same', status=Task.QUEUED).count(), 1)
+        self.assertEqual(row.status, Task.RUNNING)
+
+    def test_defaults_come_from_the_task(self):
+        record.enqueue(1)
+        row = Task.objects.get()
+        self.assertEqual((row.name, row.args, row.priority, row.max_attempts), (RECORD, [1], 1, 3))
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claims_by_priority_then_age_and_skips_future_tasks(self):
+        record.enqueue('low', priority=0)
+        record.enqueue('later', priority=9, delay=60)
+        record.enqueue('high', priority=5)
+        self.assertEqual(queue.claim('worker').args, ['high'])
+        self.assertEqual(queue.claim('worker').args, ['low'])
+        self.assertIsNone(queue.claim('worker'))
+
+    def test_each_claim_gets_its_own_lease(self):
+        record.enqueue(1)
+        record.enqueue(2)
+        first, second = queue.claim('worker'), queue.claim('worker')
+        self.assertNotEqual(first.locked_by, second.locked_by)
+        self.assertTrue(first.locked_by.startswith('worker/'))
+
+    def test_run_marks_done(self):
+        record.enqueue(1)
+        row = queue.claim('worker')
+        self.assertTrue(queue.run(row))
+        self.assertEqual(calls, [1])
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.DONE)
+        self.assertIsNotNone(row.finished_at)
+
+
+class RetryTests(TestCase):
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        explode.enqueue()
+        started = timezone.now()
+        row = queue.claim('worker')
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            self.assertFalse(queue.run(row))
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.QUEUED)
+        self.assertIn('boom', row.last_error)
+        self.assertGreaterEqual(row.run_after, started + timedelta(seconds=10))
+        self.assertIsNone(queue.claim('worker'))
+
+        Task.objects.update(run_after=timezone.now())
+        row = queue.claim('worker')
+        self.assertEqual(row.attempts, 2)
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            queue.run(row)
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.FAILED)
+
+    def test_backoff_doubles(self):
+        explode.enqueue()
+        row = queue.claim('worker')
+        row.attempts = 3
+        row.max_attempts = 5
+        Task.objects.filter(pk=row.pk).update(attempts=3, max_attempts=5)
+        now = timezone.now()
+        with mock.patch('taskqueue.queue.timezone.now', return_value=now):
+            queue._failed(row, 'error')
+        self.assertEqual(Task.objects.get().run_after, now + timedelta(seconds=40))
+
+    def test_retry_yields_to_a_queued_duplicate(self):
+        explode.enqueue(dedupe_key='key')
+        row = queue.claim('worker')
+        explode.enqueue(dedupe_key='key')
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            queue.run(row)
+        self.assertEqual(list(Task.objects.values_list('status', flat=True)), [Task.QUEUED])
+
+
+@override_settings(TASK_LEASE_SECONDS=60)
+class LeaseTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def expire_leases(self):
+        Task.objects.filter(status=Task.RUNNING).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    def test_expired_lease_is_taken_over_and_stale_claim_cannot_finish(self):
+        record.enqueue(1)
+        stale = queue.claim('dead-worker')
+        self.assertIsNone(queue.claim('other'))
+        self.expire_leases()
+        current = queue.claim('other')
+        self.assertEqual((current.pk, current.attempts), (stale.pk, 2))
+
+        # The first worker comes back and finishes late: nothing is recorded for it
+        self.assertEqual(queue._owned(stale).count(), 0)
+        with self.assertLogs('taskqueue.queue', 'WARNING') as logs:
+            queue.run(stale)
+        self.assertIn('outlived its lease', logs.output[0])
+        self.assertEqual(Task.objects.get().status, Task.RUNNING)
+        queue._failed(stale, 'late error')
+        self.assertEqual(Task.objects.get().last_error, '')
+
+        queue.run(current)
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+
+    def test_task_that_keeps_losing_its_worker_is_failed(self):
+        record.enqueue(1)
+        for _ in range(3):
+            self.assertIsNotNone(queue.claim('worker'))
+            self.expire_leases()
+        record.enqueue(2)
+        with self.assertLogs('taskqueue.queue', 'ERROR'):
+            row = queue.claim('worker')
+        self.assertEqual(row.args, [2])
+        lost = Task.objects.get(args=[1])
+        self.assertEqual((lost.status, lost.attempts), (Task.FAILED, 3))
+        self.assertIn('lease expired', lost.last_error)
+
+
+class StatsTests(TestCase):
+    def test_prune_and_stats(self):
+        record.enqueue(1)
+        record.enqueue(2)
+        queue.run(queue.claim('worker'))
+        Task.objects.filter(status=Task.DONE).update(finished_at=timezone.now() - timedelta(hours=48))
+        stats = queue.queue_stats()
+        self.assertEqual(stats['counts'][Task.DONE], 1)
+        self.assertEqual(stats['counts'][Task.QUEUED], 1)
+        self.assertEqual(queue.prune(24), 1)
@@ -18,6 +18,12 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Author directory and listings filter on both columns together
+            models.Index(fields=['role', 'is_active'], name='users_role_active_idx'),
+        ]
+    
     def __str__(self):
         return self.email
     
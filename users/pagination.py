@@ -0,0 +1,137 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over a sort key plus the primary key.
+
+    Each page is fetched with ``WHERE (key, pk) < (last_key, last_pk)`` instead
+    of an OFFSET, so deep pages cost the same as the first one. ``ordering_fields``
+    maps the public ``?ordering=`` names to the (non-null) queryset attribute
+    used as the seek key.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    ordering_fields = {}
+    default_ordering = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param, self.default_ordering)
+        if ordering.lstrip('-') not in self.ordering_fields:
+            ordering = self.default_ordering
+        descending = ordering.startswith('-')
+        return ordering, self.ordering_fields[ordering.lstrip('-')], descending
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+        return value, pk
+
+    def convert_cursor(self, queryset, key, cursor):
+        """Coerce the cursor to the types of the seek key and pk, as the query would."""
+        value, pk = cursor
+        if key in queryset.query.annotations:
+            field = queryset.query.annotations[key].output_field
+        else:
+            try:
+                field = queryset.model._meta.get_field(key)
+            except FieldDoesNotExist:
+                field = None
+        try:
+            if field is not None:
+                value = field.to_python(value)
+            pk = queryset.model._meta.pk.to_python(pk)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if value is None or pk is None:
+            raise NotFound('Invalid cursor')
+        return value, pk
+
+    def encode_cursor(self, value, pk):
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        payload = json.dumps([value, pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(payload).decode('ascii')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering, key, descending = self.get_ordering(request)
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{key}', f'{prefix}pk')
+
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = self.convert_cursor(queryset, key, cursor)
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{key}__{lookup}': value}) | Q(**{key: value, f'pk__{lookup}': pk})
+            )
+
+        # One extra row tells us whether there is a next page without a COUNT(*)
+        rows = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        self.next_cursor = None
+        if self.has_next:
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, key), last.pk)
+        return rows
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.ordering_param, self.ordering)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'ordering': self.ordering,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'ordering': {'type': 'string'},
+                'results': schema,
+            },
+        }
+
+
+class AuthorDirectoryPagination(KeysetPagination):
+    ordering_fields = {
+        'post_count': 'post_count',
+        'total_views': 'total_views',
+        'latest_published_at': 'latest_published_sort',
+        'username': 'username',
+    }
+    default_ordering = '-post_count'
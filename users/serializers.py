@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
+from blog_backend.compiled_serializers import CompiledSerializer
 from .models import User
 
 class UserCreateSerializer(BaseUserCreateSerializer):
@@ -13,3 +14,17 @@ class UserSerializer(BaseUserSerializer):
         model = User
         fields = ('id', 'username', 'email', 'role', 'bio', 'avatar', 'created_at')
         read_only_fields = ('id', 'created_at')
+
+
+compiled_user = CompiledSerializer(UserSerializer)
+
+
+class AuthorDirectorySerializer(UserSerializer):
+    """Author profile plus aggregates annotated by the directory queryset"""
+    post_count = serializers.IntegerField(read_only=True)
+    total_views = serializers.IntegerField(read_only=True)
+    latest_published_at = serializers.DateTimeField(read_only=True)
+    
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('post_count', 'total_views', 'latest_published_at')
+        read_only_fields = fields
@@ -0,0 +1,44 @@
+import base64
+import json
+
+from django.test import TestCase
+
+from .models import User
+
+
+def cursor(value, pk):
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode('utf-8')).decode('ascii')
+
+
+class AuthorDirectoryCursorTests(TestCase):
+    url = '/api/users/authors/directory/'
+
+    def setUp(self):
+        for number in range(3):
+            User.objects.create_user(
+                username=f'author{number}', email=f'author{number}@example.com', password='x', role='author',
+            )
+
+    def test_walks_every_ordering(self):
+        for ordering in ('post_count', '-total_views', 'latest_published_at', '-username'):
+            seen = []
+            response = self.client.get(self.url, {'ordering': ordering, 'page_size': 2})
+            while True:
+                self.assertEqual(response.status_code, 200, ordering)
+                seen.extend(author['username'] for author in response.json()['results'])
+                if not response.json()['next']:
+                    break
+                response = self.client.get(response.json()['next'])
+            self.assertCountEqual(seen, ['author0', 'author1', 'author2'], ordering)
+
+    def test_malformed_cursor_is_not_found(self):
+        for ordering, bad in [
+            ('post_count', cursor('abc', 1)),
+            ('latest_published_at', cursor('yesterday', 1)),
+            ('username', cursor('author1', 'abc')),
+            ('post_count', cursor(None, 1)),
+            ('post_count', cursor([1], 1)),
+            ('post_count', 'not base64!'),
+        ]:
+            response = self.client.get(self.url, {'ordering': ordering, 'cursor': bad})
+            self.assertEqual(response.status_code, 404, (ordering, bad))
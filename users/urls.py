@@ -11,6 +11,7 @@ urlpatterns = [
     path('', views.UserListView.as_view(), name='user-list'),
     path('<int:pk>/', views.UserDetailView.as_view(), name='user-detail'),
     path('authors/', views.authors_list, name='authors-list'),
+    path('authors/directory/', views.AuthorDirectoryView.as_view(), name='author-directory'),
     
     # Statistics
     path('stats/', views.user_stats, name='user-stats'),
@@ -2,8 +2,12 @@ from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
+from django.db.models import Count, DateTimeField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from datetime import datetime, timezone
 from .models import User
-from .serializers import UserSerializer
+from .pagination import AuthorDirectoryPagination
+from .serializers import AuthorDirectorySerializer, UserSerializer, compiled_user
 
 User = get_user_model()
 
@@ -27,6 +31,28 @@ class UserDetailView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
 
+class AuthorDirectoryView(generics.ListAPIView):
+    """Authors with published post count, total views and latest publish date"""
+    serializer_class = AuthorDirectorySerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = AuthorDirectoryPagination
+    
+    # Sort key for authors who have never published, keeps keyset cursors non-null
+    NEVER_PUBLISHED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    
+    def get_queryset(self):
+        published = Q(posts__status='published')
+        latest = Max('posts__published_at', filter=published)
+        # A single GROUP BY over the users/posts join instead of one query per author
+        return User.objects.filter(role__in=['author', 'admin'], is_active=True).annotate(
+            post_count=Count('posts', filter=published),
+            total_views=Coalesce(Sum('posts__views_count', filter=published), 0),
+            latest_published_at=latest,
+            latest_published_sort=Coalesce(
+                latest, Value(self.NEVER_PUBLISHED, output_field=DateTimeField())
+            ),
+        )
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def user_stats(request):
@@ -59,8 +85,7 @@ def user_stats(request):
 def authors_list(request):
     """Get list of all authors"""
     authors = User.objects.filter(role__in=['author', 'admin'], is_active=True)
-    serializer = UserSerializer(authors, many=True)
-    return Response(serializer.data)
+    return Response(compiled_user.data(authors))
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -86,6 +111,7 @@ def update_profile(request):
     serializer = UserSerializer(user, data=request.data, partial=True)
     
     if serializer.is_valid():
+        # Cached post payloads embed the author's profile, see blog.object_cache.author_saved
         serializer.save()
         return Response(serializer.data)
     